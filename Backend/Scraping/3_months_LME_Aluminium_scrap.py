@@ -1,8 +1,7 @@
 import os
 import time
+import atexit
 import threading
-import pandas as pd
-import json
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -10,7 +9,18 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from flask import Flask, jsonify, send_file, Response, render_template
+from flask import Flask, jsonify, request, send_file, Response, render_template
+from driver_pool import DriverPool
+from broadcast import Broadcaster, format_sse
+from timeseries_store import TickStore
+from snapshot import save_snapshot, load_snapshot, read_last_csv_row
+from csv_store import ChangeLog
+from market_schedule import AdaptiveScheduler
+from metrics import RETRIES, SELECTOR_WAIT_SECONDS, STAGE_SECONDS, metrics_response, stage
+from investing_quote import (
+    XPATH_PRICE, XPATH_CHANGE_VALUE, XPATH_CHANGE_PERCENT, XPATH_TIME,
+    create_session, fetch_quote
+)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -21,9 +31,17 @@ os.makedirs(csv_dir, exist_ok=True)
 
 csv_path = os.path.join(csv_dir, "3_months_LME_scrap.csv")
 
-# Initialize CSV file with headers if it doesn't exist
-if not os.path.exists(csv_path):
-    pd.DataFrame(columns=["Value", "Time Span", "Rate of Change", "Timestamp"]).to_csv(csv_path, index=False)
+# Initialize CSV file with headers if it doesn't exist; a row is only added
+# when the quote differs from the last stored one, not on every poll
+csv_log = ChangeLog(csv_path, ["Value", "Time Span", "Rate of Change", "Timestamp"],
+                    compare=["Value", "Time Span", "Rate of Change"])
+
+# Last written row, kept in a sidecar file so the /data fallback never reads the whole CSV
+snapshot_path = os.path.join(csv_dir, "3_months_LME_latest.json")
+last_known_row = load_snapshot(snapshot_path) or read_last_csv_row(csv_path)
+
+# Indexed history for /history (the CSV stays as the downloadable export)
+tick_store = TickStore()
 
 # Track the latest data for quick access
 latest_data = {
@@ -34,15 +52,17 @@ latest_data = {
     "error": None
 }
 
-# Create an event to notify when new data is available
-new_data_event = threading.Event()
+# Fan-out hub that pushes each new tick to every /stream client
+broadcaster = Broadcaster(name="lme_3m")
 
 # Define constants
-URL = "https://in.investing.com/commodities/aluminum"
-XPATH_PRICE = "//div[@data-test='instrument-price-last']"
-XPATH_CHANGE_VALUE = "//span[@data-test='instrument-price-change']"
-XPATH_CHANGE_PERCENT = "//span[@data-test='instrument-price-change-percent']"
-XPATH_TIME = "//time[@data-test='trading-time-label']"
+URL = os.getenv("LME_3M_URL", "https://in.investing.com/commodities/aluminum")
+
+# "http" reads the server-rendered HTML first and only starts Chrome when the
+# quote fields are missing; "selenium" always uses the browser
+SCRAPE_MODE = os.getenv("LME_SCRAPE_MODE", "http")
+http_session = create_session()
+mode_counts = {"http": 0, "selenium": 0}
 
 def get_browser_options():
     options = webdriver.ChromeOptions()
@@ -58,10 +78,16 @@ def get_browser_options():
     options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
     return options
 
+# Resolve the chromedriver binary once instead of on every driver start
+chromedriver_path = None
+
 def create_driver():
     """Create and return a new WebDriver instance"""
+    global chromedriver_path
     try:
-        service = Service(ChromeDriverManager().install())
+        if chromedriver_path is None:
+            chromedriver_path = ChromeDriverManager().install()
+        service = Service(chromedriver_path)
         options = get_browser_options()
         driver = webdriver.Chrome(service=service, options=options)
         driver.set_page_load_timeout(60)
@@ -71,28 +97,64 @@ def create_driver():
         latest_data["error"] = str(e)
         return None
 
-def scrape_data():
-    """Scrape data and store it in the latest_data dict and CSV"""
-    global latest_data
-    driver = None
-    try:
-        driver = create_driver()
-        if not driver:
-            print("Failed to create WebDriver")
-            return False
-        
-        # Navigate to the page
+# Warm Chrome sessions shared by the background loop and /data
+driver_pool = DriverPool(create_driver, size=1, name="lme_3m")
+atexit.register(driver_pool.close)
+
+def load_page(driver):
+    """Reload the open tab if it already shows URL, otherwise navigate to it"""
+    if driver.current_url.rstrip("/") == URL:
+        driver.refresh()
+    else:
         driver.get(URL)
+
+def extract_with_driver(driver):
+    """Read the quote fields from the page currently loaded in driver"""
+    return {
+        "value": driver.find_element(By.XPATH, XPATH_PRICE).text,
+        "change_value": driver.find_element(By.XPATH, XPATH_CHANGE_VALUE).text,
+        "change_percent": driver.find_element(By.XPATH, XPATH_CHANGE_PERCENT).text,
+        "time_span": driver.find_element(By.XPATH, XPATH_TIME).text,
+    }
+
+def scrape_with_driver():
+    """Selenium path: load URL in a pooled Chrome session and read the quote"""
+    driver = driver_pool.acquire()
+    try:
+        # Navigate to the page (or reload the already open tab)
+        with stage("lme_3m", "page_load"):
+            load_page(driver)
         
         # Wait for main price element to be visible
-        wait = WebDriverWait(driver, 20)
-        wait.until(EC.visibility_of_element_located((By.XPATH, XPATH_PRICE)))
+        with SELECTOR_WAIT_SECONDS.time(service="lme_3m", field="price"):
+            wait = WebDriverWait(driver, 20)
+            wait.until(EC.visibility_of_element_located((By.XPATH, XPATH_PRICE)))
         
-        # Extract data
-        value = driver.find_element(By.XPATH, XPATH_PRICE).text
-        rate_change_value = driver.find_element(By.XPATH, XPATH_CHANGE_VALUE).text
-        rate_change_percent = driver.find_element(By.XPATH, XPATH_CHANGE_PERCENT).text
-        time_span = driver.find_element(By.XPATH, XPATH_TIME).text
+        with stage("lme_3m", "extraction"):
+            return extract_with_driver(driver)
+    finally:
+        # Keep the session warm; the pool only recycles it if it is unhealthy
+        driver_pool.release(driver)
+
+def scrape_data():
+    """Scrape data and store it in the latest_data dict and CSV"""
+    global latest_data, last_known_row
+    started = time.perf_counter()
+    try:
+        # Try the plain HTTP path first, fall back to Chrome if fields are missing
+        quote = None
+        source = "http"
+        if SCRAPE_MODE == "http":
+            quote = fetch_quote(http_session, URL, service="lme_3m")
+        if quote is None:
+            source = "selenium"
+            quote = scrape_with_driver()
+        mode_counts[source] += 1
+        
+        value = quote["value"]
+        rate_change_value = quote["change_value"]
+        rate_change_percent = quote["change_percent"]
+        time_span = quote["time_span"]
         
         # Combine absolute & percentage change
         rate_change = f"{rate_change_value} ({rate_change_percent})"
@@ -109,33 +171,36 @@ def scrape_data():
             "error": None
         }
         
-        # Save to CSV for historical records
-        data = pd.DataFrame([[value, time_span, rate_change, timestamp]], 
-                            columns=["Value", "Time Span", "Rate of Change", "Timestamp"])
-        data.to_csv(csv_path, mode="a", index=False, header=False)
+        # Save to CSV for historical records (skipped while the quote is unchanged)
+        row = {"Value": value, "Time Span": time_span, "Rate of Change": rate_change, "Timestamp": timestamp}
+        with stage("lme_3m", "persistence"):
+            if csv_log.append(row):
+                last_known_row = row
+                save_snapshot(snapshot_path, last_known_row)
+                tick_store.append("lme_3m", "aluminium", timestamp, value,
+                                  rate_change_value, rate_change_percent, {"time_span": time_span})
         
-        # Set the event to trigger updates to connected clients
-        new_data_event.set()
-        new_data_event.clear()
+        # Push the update to connected clients (serialized once for all of them)
+        broadcaster.publish(latest_data)
         
-        print(f"✅ Data scraped at {timestamp}: {value} | {rate_change} | {time_span}")
+        elapsed = time.perf_counter() - started
+        driver_pool.record_latency(elapsed)
+        STAGE_SECONDS.observe(elapsed, service="lme_3m", stage="total")
+        print(f"✅ Data scraped at {timestamp} via {source}: {value} | {rate_change} | {time_span} ({elapsed:.2f}s)")
         return True
     
     except Exception as e:
         print(f"❌ Error during scraping: {e}")
         latest_data["error"] = str(e)
         return False
-    
-    finally:
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+
+# Poll fast while LME is trading and the price moves, slow heartbeat otherwise
+scheduler = AdaptiveScheduler("LME", min_interval=1, max_interval=30, off_hours_interval=900)
 
 def continuous_scraping(interval=1):
-    """Function to continuously scrape data at regular intervals"""
+    """Function to continuously scrape data at market-aware intervals"""
     max_retries = 3  # Maximum retries per attempt
+    scheduler.min_interval = interval
     
     while True:
         try:
@@ -146,12 +211,16 @@ def continuous_scraping(interval=1):
                 if success:
                     break
                 else:
+                    RETRIES.inc(service="lme_3m")
                     print(f"Retry {retry+1}/{max_retries}...")
                     time.sleep(2)
             
-            # Sleep for the specified interval between scrapes
-            print(f"Waiting {interval} seconds before next scrape...")
-            time.sleep(interval)
+            # Speed up while the price moves, back off while it is flat or the market is closed
+            if success:
+                scheduler.observe(latest_data["Value"])
+            delay = scheduler.next_delay()
+            print(f"Waiting {delay:.1f} seconds before next scrape...")
+            time.sleep(delay)
             
         except Exception as e:
             print(f"❌ Unexpected error in scraping thread: {e}")
@@ -175,19 +244,13 @@ def get_data():
             "data": latest_data
         })
     
-    # If scraping failed, try to return the latest data from CSV
-    try:
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
-            if not df.empty:
-                csv_latest = df.iloc[-1].to_dict()
-                return jsonify({
-                    "success": True,
-                    "data": csv_latest,
-                    "note": "Using latest available data from CSV"
-                })
-    except Exception as e:
-        pass
+    # If scraping failed, return the last row written (loaded at startup, kept current on every write)
+    if last_known_row:
+        return jsonify({
+            "success": True,
+            "data": last_known_row,
+            "note": "Using latest available data from CSV"
+        })
     
     # No data available
     return jsonify({
@@ -198,23 +261,35 @@ def get_data():
 @app.route('/stream')
 def stream():
     """SSE endpoint for pushing updates to connected clients"""
-    def generate():
-        while True:
-            # Wait for the new data event to be set
-            new_data_event.wait(timeout=120)
-            
-            # Send the latest data
-            if latest_data["Value"] is not None:
-                data_str = json.dumps(latest_data)
-                yield f"data: {data_str}\n\n"
-            
-            # If no update in 30 seconds, send a heartbeat to keep connection alive
-            else:
-                yield f"data: {json.dumps({'heartbeat': True})}\n\n"
-                
-            time.sleep(5)  # Small delay to prevent CPU overload
-    
-    return Response(generate(), mimetype="text/event-stream")
+    # New clients get the current value straight away, then every tick as it lands
+    initial = format_sse(latest_data) if latest_data["Value"] is not None else None
+    return Response(
+        broadcaster.stream(initial),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/stats')
+def get_stats():
+    """Return driver reuse counts and per-scrape latency"""
+    return jsonify({
+        "success": True,
+        "scrape_mode": SCRAPE_MODE,
+        "mode_counts": mode_counts,
+        "driver_pool": driver_pool.stats(),
+        "stream": broadcaster.stats(),
+        "schedule": scheduler.state()
+    })
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text: stage latencies, upstream status codes, retries, data age"""
+    return metrics_response()
+
+@app.route('/history')
+def get_history():
+    """Return stored ticks between ?from= and ?to= (dates or timestamps)"""
+    return jsonify(tick_store.history_from_args("lme_3m", request.args))
 
 @app.route('/download')
 def download_csv():
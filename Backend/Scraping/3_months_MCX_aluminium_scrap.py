@@ -1,30 +1,49 @@
 import csv
 import os
 import time
+import atexit
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime, timedelta
-from flask import Flask, jsonify, send_file, Response
+from flask import Flask, jsonify, request, send_file, Response
 from flask_cors import CORS
+from broadcast import DeltaBroadcaster
+from timeseries_store import TickStore, parse_change
+from market_schedule import AdaptiveScheduler
+from selector_cache import SelectorCache
+from driver_pool import DriverPool
+from scrape_cache import ScrapeCache
+from dom_wait import arm_mutation_watch, read_text, wait_for_update
+from mcx_extract import PageSnapshot, extract_contract, first_match, parse_market_timestamp
+from metrics import SELECTOR_WAIT_SECONDS, STAGE_SECONDS, metrics_response, stage
 
 app = Flask(__name__)
 CORS(app)
 
 # Global variables
 latest_data = {}  # Stores the most recent data
+broadcaster = DeltaBroadcaster(name="mcx")  # Pushes only what changed to /stream clients
 csv_filename = "mcx_aluminium_prices.csv"
+tick_store = TickStore()  # Indexed history behind /history
+# Remembers which fallback selectors actually work so they are tried first
+selector_cache = SelectorCache(os.path.join("scraped_csv", "mcx_selector_cache.json"), name="mcx")
 
 # Ensure directory exists if needed
 os.makedirs(os.path.dirname(csv_filename) if os.path.dirname(csv_filename) else '.', exist_ok=True)
 
-# URL of the page
-url = "https://www.5paisa.com/commodity-trading/mcx-aluminium-price"
+# URL of the page (MCX_URL overrides it, e.g. for the offline benchmark stand-in)
+url = os.getenv("MCX_URL", "https://www.5paisa.com/commodity-trading/mcx-aluminium-price")
+
+# Resolve the chromedriver binary once instead of on every driver start
+chromedriver_path = None
 
 # Setup Selenium WebDriver
 def get_driver():
@@ -36,7 +55,10 @@ def get_driver():
     options.add_argument("--window-size=1920,1080")
     options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36")
     
-    service = Service(ChromeDriverManager().install())
+    global chromedriver_path
+    if chromedriver_path is None:
+        chromedriver_path = ChromeDriverManager().install()
+    service = Service(chromedriver_path)
     driver = webdriver.Chrome(service=service, options=options)
     return driver
 
@@ -73,65 +95,177 @@ def get_contract_months():
 
 contract_months = get_contract_months()
 
+# MCX_PARALLEL_CONTRACTS=1 scrapes every contract month at once, each in its own
+# warm Chrome session, so a tick takes about as long as the slowest contract
+PARALLEL_CONTRACTS = os.getenv("MCX_PARALLEL_CONTRACTS", "0") == "1"
+driver_pool = DriverPool(get_driver, size=len(contract_months) if PARALLEL_CONTRACTS else 1, name="mcx")
+contract_executor = (
+    ThreadPoolExecutor(max_workers=len(contract_months), thread_name_prefix="mcx-contract")
+    if PARALLEL_CONTRACTS else None
+)
+atexit.register(driver_pool.close)
+
+# Selectors evaluated in-process against a page_source snapshot (see mcx_extract.py);
+# the price ones are also used to watch for the price re-rendering after a contract click
+PRICE_SELECTORS = [
+    # Try specific classes
+    "//div[contains(@class, 'commodity-page__value')]", 
+    "//div[contains(@class, 'value')]/span", 
+    "//div[contains(@class, 'value')]", 
+    "//span[contains(@class, 'value')]",
+    
+    # Try by content type
+    "//span[contains(text(), '₹')]",
+    "//div[contains(text(), '₹')]",
+    "//h1[contains(text(), '₹')]",
+    "//h2[contains(text(), '₹')]",
+    "//h3[contains(text(), '₹')]",
+    "//p[contains(text(), '₹')]",
+    
+    # Try by structure
+    "//div[contains(@class, 'price')]/parent::div",
+    "//div[contains(@class, 'rate')]/parent::div"
+]
+
+RATE_SELECTORS = [
+    "//div[contains(@class, 'commodity-page__percentage')]",
+    "//div[contains(@class, 'percentage')]",
+    "//span[contains(@class, 'change')]",
+    "//div[contains(@class, 'change')]",
+    "//span[contains(text(), '%')]",
+    "//div[contains(text(), '%')]"
+]
+
+DATE_SELECTORS = [
+    "//div[contains(@class, 'date')]",
+    "//div[contains(@class, 'commodity-page__date')]",
+    "//span[contains(@class, 'date')]",
+    "//p[contains(text(), 'As on')]",
+    "//*[contains(text(), 'As on')]"
+]
+
+# Ceiling for the post-click wait; it normally returns as soon as the price re-renders
+CONTRACT_WAIT_CEILING = float(os.getenv("MCX_CONTRACT_WAIT", "3"))
+
+def scrape_contract(driver, month_key, month_info):
+    """Select one contract month on the loaded page and read its price and rate change"""
+    # Try each XPath option to find the contract element
+    found = False
+    
+    # The XPaths embed the month name, so rank them by template position
+    xpath_options = month_info["xpath_options"]
+    template_keys = [f"template_{i}" for i in range(len(xpath_options))]
+    for key, xpath in selector_cache.ranked("contract", xpath_options, template_keys):
+        started = time.perf_counter()
+        try:
+            # Find and click the contract month
+            print(f"Trying to find element for {month_key} with xpath: {xpath}")
+            element = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located((By.XPATH, xpath))
+            )
+            already_selected = driver.execute_script("return arguments[0].checked === true;", element)
+            previous_price = read_text(driver, PRICE_SELECTORS)
+            arm_mutation_watch(driver)
+            driver.execute_script("arguments[0].click();", element)
+            selector_cache.record("contract", key, True, time.perf_counter() - started)
+            print(f"Clicked element for {month_key}")
+            # Wait for the price to update, unless this contract was already showing
+            if not already_selected:
+                waited = wait_for_update(driver, PRICE_SELECTORS, previous_price, timeout=CONTRACT_WAIT_CEILING)
+                SELECTOR_WAIT_SECONDS.observe(waited, service="mcx", field="price_update")
+                print(f"Price updated after {waited:.2f}s")
+            found = True
+            break
+        except Exception as e:
+            selector_cache.record("contract", key, False, time.perf_counter() - started)
+            print(f"Failed to find/click xpath {xpath}: {str(e)}")
+            continue
+    
+    if not found:
+        print(f"Could not locate any element for {month_key}")
+        return {
+            "price": "N/A",
+            "site_rate_change": "N/A"
+        }
+    
+    # Read every field from one copy of the page instead of per-field WebDriver calls
+    with stage("mcx", "extraction"):
+        snapshot = PageSnapshot(driver.page_source)
+        result = extract_contract(snapshot, PRICE_SELECTORS, RATE_SELECTORS, selector_cache)
+    print(f"{month_key}: price={result['price']} | rate change={result['site_rate_change']}")
+    return result
+
+def load_rendered(driver):
+    """Load the page and wait once for the quote to render"""
+    with stage("mcx", "page_load"):
+        driver.get(url)
+        print(f"Page loaded: {driver.title}")
+        try:
+            WebDriverWait(driver, 20, poll_frequency=0.2).until(lambda d: read_text(d, PRICE_SELECTORS))
+        except TimeoutException:
+            print("⚠️ Price not rendered after 20s, reading the page as it is")
+
+def read_market_timestamp(driver):
+    """Market date/time shown on the loaded page, from a single page snapshot; None if not found"""
+    with stage("mcx", "extraction"):
+        snapshot = PageSnapshot(driver.page_source)
+        selector, date_time_text, market_timestamp = first_match(
+            snapshot, "date", DATE_SELECTORS, selector_cache, parse_market_timestamp
+        )
+    if market_timestamp:
+        print(f"Found date with selector: {selector} ({date_time_text})")
+    return market_timestamp
+
+def scrape_contract_in_worker(month_key, month_info, read_date=False):
+    """Parallel mode: load the page in a pooled session of its own and scrape one contract.
+
+    Returns (contract result, market timestamp or None); only the worker
+    asked to ``read_date`` reads the date, from the page it loaded anyway.
+    """
+    driver = driver_pool.acquire()
+    try:
+        load_rendered(driver)
+        market_timestamp = read_market_timestamp(driver) if read_date else None
+        return scrape_contract(driver, month_key, month_info), market_timestamp
+    except Exception as e:
+        print(f"❌ Error scraping {month_key}: {str(e)}")
+        return {
+            "price": "N/A",
+            "site_rate_change": "N/A"
+        }, None
+    finally:
+        driver_pool.release(driver)
+
 def scrape_data():
     """Scrape the data from the website and return it in JSON format"""
     global latest_data
     
     print(f"\n🚀 Scraping started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    started = time.perf_counter()
     driver = None
     
     try:
-        # Initialize the driver
-        driver = get_driver()
-        driver.get(url)
-        print(f"Page loaded: {driver.title}")
-        
-        # Get the date and time from the website
-        market_timestamp = None
-        date_time_text = None
-        date_selectors = [
-            "//div[contains(@class, 'date')]",
-            "//div[contains(@class, 'commodity-page__date')]",
-            "//span[contains(@class, 'date')]",
-            "//p[contains(text(), 'As on')]",
-            "//*[contains(text(), 'As on')]"
-        ]
-        
-        for selector in date_selectors:
-            try:
-                date_element = WebDriverWait(driver, 5).until(
-                    EC.visibility_of_element_located((By.XPATH, selector))
-                )
-                date_time_text = date_element.text.strip()
-                print(f"Found date with selector: {selector}")
-                print(f"Date text: {date_time_text}")
-                break
-            except Exception as e:
-                print(f"Date selector {selector} failed: {str(e)}")
-                continue
+        # Get data for each contract month
+        prices = {}
+        if contract_executor is None:
+            # One warm driver: load once, then click through the contracts
+            driver = driver_pool.acquire()
+            load_rendered(driver)
+            market_timestamp = read_market_timestamp(driver)
+            for month_key, month_info in contract_months.items():
+                prices[month_key] = scrape_contract(driver, month_key, month_info)
+        else:
+            # Every contract loads in a session of its own at the same time;
+            # the first one also reads the date, so a tick costs about one contract
+            futures = {
+                month_key: contract_executor.submit(scrape_contract_in_worker, month_key, month_info, i == 0)
+                for i, (month_key, month_info) in enumerate(contract_months.items())
+            }
+            market_timestamp = None
+            for month_key, future in futures.items():
+                prices[month_key], timestamp = future.result()
+                market_timestamp = market_timestamp or timestamp
         
-        # Parse the date and time
-        if date_time_text:
-            # Remove "As on" or similar prefixes
-            date_time_text = date_time_text.replace("As on", "").strip()
-            
-            # Try different date formats
-            date_formats = [
-                "%d %B, %Y | %H:%M",
-                "%d %B %Y | %H:%M",
-                "%d %B, %Y %H:%M",
-                "%d %b, %Y | %H:%M",
-                "%B %d, %Y | %H:%M"
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    market_timestamp = datetime.strptime(date_time_text, fmt)
-                    print(f"Parsed date using format {fmt}: {market_timestamp}")
-                    break
-                except ValueError:
-                    continue
-                    
         # If we couldn't parse the date, use current time
         if not market_timestamp:
             market_timestamp = datetime.now()
@@ -147,200 +281,37 @@ def scrape_data():
             "date": date_str,
             "time": time_str,
             "timestamp": timestamp_str,  # Full timestamp
-            "prices": {}
+            "prices": prices
         }
         
-        # Get data for each contract month
-        for month_key, month_info in contract_months.items():
-            # Try each XPath option to find the contract element
-            found = False
-            
-            for xpath in month_info["xpath_options"]:
-                try:
-                    # Find and click the contract month
-                    print(f"Trying to find element for {month_key} with xpath: {xpath}")
-                    element = WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.XPATH, xpath))
-                    )
-                    driver.execute_script("arguments[0].click();", element)
-                    print(f"Clicked element for {month_key}")
-                    time.sleep(3)  # Wait for price to update
-                    found = True
-                    break
-                except Exception as e:
-                    print(f"Failed to find/click xpath {xpath}: {str(e)}")
-                    continue
-            
-            if not found:
-                print(f"Could not locate any element for {month_key}")
-                data["prices"][month_key] = {
-                    "price": "N/A",
-                    "site_rate_change": "N/A"
-                }
-                continue
-            
-            # Get the price - trying multiple different selectors
-            price_selectors = [
-                # Try specific classes
-                "//div[contains(@class, 'commodity-page__value')]", 
-                "//div[contains(@class, 'value')]/span", 
-                "//div[contains(@class, 'value')]", 
-                "//span[contains(@class, 'value')]",
-                
-                # Try by content type
-                "//span[contains(text(), '₹')]",
-                "//div[contains(text(), '₹')]",
-                "//h1[contains(text(), '₹')]",
-                "//h2[contains(text(), '₹')]",
-                "//h3[contains(text(), '₹')]",
-                "//p[contains(text(), '₹')]",
-                
-                # Try by structure
-                "//div[contains(@class, 'price')]/parent::div",
-                "//div[contains(@class, 'rate')]/parent::div"
-            ]
-            
-            price_found = False
-            for selector in price_selectors:
-                try:
-                    price_element = WebDriverWait(driver, 5).until(
-                        EC.visibility_of_element_located((By.XPATH, selector))
-                    )
-                    price_text = price_element.text.strip()
-                    print(f"Found price with selector: {selector}")
-                    print(f"Price text: {price_text}")
-                    
-                    # If multiple values are in the text, extract the one with a Rupee symbol
-                    if "₹" in price_text:
-                        # Extract the price using a more robust approach
-                        import re
-                        price_match = re.search(r'₹\s*([\d,.]+)', price_text)
-                        if price_match:
-                            price_text = price_match.group(1)
-                    
-                    # Clean the price text
-                    price_text = price_text.replace("₹", "").replace(",", "").strip()
-                    
-                    # Try to convert to float
-                    try:
-                        price = float(price_text)
-                        price_found = True
-                        print(f"Successfully parsed price: {price}")
-                        break
-                    except ValueError:
-                        print(f"Could not convert '{price_text}' to float")
-                        continue
-                except Exception as e:
-                    print(f"Price selector {selector} failed: {str(e)}")
-                    continue
-            
-            if not price_found:
-                print(f"Could not find price for {month_key}")
-                
-                # Try a fallback method - look through the whole page source
-                try:
-                    # Look for any elements with "₹" symbol
-                    elements = driver.find_elements(By.XPATH, "//*[contains(text(), '₹')]")
-                    if elements:
-                        for el in elements:
-                            text = el.text.strip()
-                            print(f"Potential price element: {text}")
-                            try:
-                                import re
-                                price_match = re.search(r'₹\s*([\d,.]+)', text)
-                                if price_match:
-                                    price_text = price_match.group(1).replace(",", "")
-                                    price = float(price_text)
-                                    price_found = True
-                                    print(f"Fallback price found: {price}")
-                                    break
-                            except:
-                                continue
-                except Exception as fallback_err:
-                    print(f"Fallback price search failed: {str(fallback_err)}")
-            
-            if not price_found:
-                # Last resort - extract from rate change if available
-                price = "N/A"
-            
-            # Get the rate change
-            rate_change = "N/A"
-            rate_selectors = [
-                "//div[contains(@class, 'commodity-page__percentage')]",
-                "//div[contains(@class, 'percentage')]",
-                "//span[contains(@class, 'change')]",
-                "//div[contains(@class, 'change')]",
-                "//span[contains(text(), '%')]",
-                "//div[contains(text(), '%')]"
-            ]
+        with stage("mcx", "persistence"):
+            # Persist what the selectors learned during this scrape
+            selector_cache.save()
             
-            for selector in rate_selectors:
-                try:
-                    rate_element = WebDriverWait(driver, 3).until(
-                        EC.visibility_of_element_located((By.XPATH, selector))
-                    )
-                    rate_change = rate_element.text.strip()
-                    print(f"Found rate change with selector: {selector}")
-                    print(f"Rate change text: {rate_change}")
-                    
-                    # Try to extract price from rate change if price is N/A
-                    if price == "N/A" and "(" in rate_change and ")" in rate_change:
-                        try:
-                            # Parse the rate change to get the price
-                            import re
-                            # Something like "-5 (-2.1%)" - the absolute value is the first number
-                            change_match = re.search(r'([+-]?\d+(\.\d+)?)', rate_change)
-                            percent_match = re.search(r'\(([-+]?\d+(\.\d+)?)%\)', rate_change)
-                            
-                            if change_match and percent_match:
-                                change_value = float(change_match.group(1))
-                                percent = float(percent_match.group(1))
-                                
-                                # Calculate original price: change_value is percent% of original
-                                # So original = change_value / (percent/100)
-                                if percent != 0:  # Avoid division by zero
-                                    calculated_price = abs(change_value / (percent/100))
-                                    price = calculated_price
-                                    print(f"Calculated price from rate change: {price}")
-                        except Exception as calc_err:
-                            print(f"Failed to calculate price from rate change: {str(calc_err)}")
-                    
-                    break
-                except Exception as e:
-                    print(f"Rate selector {selector} failed: {str(e)}")
-                    continue
-            
-            # Add to data
-            data["prices"][month_key] = {
-                "price": price,
-                "site_rate_change": rate_change
-            }
-        
-        # Close the driver
-        driver.quit()
+            # Save to CSV and the time-series store
+            save_to_csv(data)
+            save_to_store(data)
         
-        # Save to CSV
-        save_to_csv(data)
-        
-        # Update the global latest_data
+        # Update the global latest_data and push only the changed fields to connected clients
         latest_data = data
+        broadcaster.publish_changes(latest_data)
         
-        print(f"✅ Scraping completed for timestamp: {data['timestamp']}")
+        driver_pool.record_latency(time.perf_counter() - started)
+        STAGE_SECONDS.observe(time.perf_counter() - started, service="mcx", stage="total")
+        print(f"✅ Scraping completed for timestamp: {data['timestamp']} ({time.perf_counter() - started:.2f}s)")
         return data
         
     except Exception as e:
         print(f"❌ Error during scraping: {str(e)}")
-        # If driver is still open, close it
-        try:
-            if driver:
-                driver.quit()
-        except:
-            pass
         
-        # Return error or latest data if available
-        if latest_data:
-            return latest_data
+        # Always report the failure so scrape_cache keeps its last good result
+        # (and its real age) instead of caching latest_data as a fresh scrape
         return {"error": str(e)}
+    
+    finally:
+        # Keep the session warm; the pool only recycles it if it is unhealthy
+        if driver:
+            driver_pool.release(driver)
 
 def save_to_csv(data):
     """Save the scraped data to a CSV file"""
@@ -375,31 +346,74 @@ def save_to_csv(data):
     
     print(f"Data saved to {csv_filename}")
 
-# Simple background thread that scrapes data every 10 seconds
+def save_to_store(data):
+    """Write one numeric tick per contract month to the time-series store"""
+    for month, values in data["prices"].items():
+        if values.get("price") in (None, "N/A"):
+            continue
+        change, change_pct = parse_change(values.get("site_rate_change"))
+        tick_store.append("mcx", month, data["timestamp"], values["price"], change, change_pct)
+
+# 10 s while MCX is trading and prices move, backing off to a slow heartbeat otherwise
+scheduler = AdaptiveScheduler("MCX", min_interval=10, max_interval=60, off_hours_interval=900)
+
+# Background thread that scrapes on the market-aware schedule
 def background_scraper():
     while True:
         try:
-            scrape_data()
+            data = scrape_data()
+            if data and "prices" in data:
+                scheduler.observe(json.dumps(data["prices"], sort_keys=True))
         except Exception as e:
             print(f"Error in background scraper: {str(e)}")
         
-        time.sleep(10)  # 10-second interval as requested
+        time.sleep(scheduler.next_delay())
 
 
+# On-demand scrapes share one in-flight scrape and a short-lived cached result
+scrape_cache = ScrapeCache(scrape_data, ttl=10, stale_ttl=60, name="mcx",
+                           is_valid=lambda data: bool(data) and "error" not in data)
+
 @app.route("/scrape", methods=["GET"])
 def scrape():
-    data = scrape_data()
+    data = scrape_cache.get()
+    if (not data or "error" in data) and latest_data:
+        # The scrape failed; serve the last good data rather than the error
+        return jsonify(latest_data)
     return jsonify(data)
 
 @app.route("/stream")
 def stream():
-    def event_stream():
-        """Server-sent event generator function."""
-        while True:
-            yield f"data: {json.dumps(latest_data)}\n\n"
-            time.sleep(10)  # Send updates every 10 seconds
-    
-    return Response(event_stream(), mimetype="text/event-stream")
+    """Server-sent events: full snapshot on connect, then `delta` events with only the changed fields"""
+    return Response(
+        broadcaster.stream_with_snapshot(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/history", methods=["GET"])
+def history():
+    """Stored ticks between ?from= and ?to=, optionally for one ?instrument= (contract month)"""
+    return jsonify(tick_store.history_from_args("mcx", request.args))
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Driver reuse counts and per-tick latency"""
+    return jsonify({
+        "parallel_contracts": PARALLEL_CONTRACTS,
+        "driver_pool": driver_pool.stats(),
+        "scrape_cache": scrape_cache.stats()
+    })
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text: stage latencies, selector waits and misses, data age"""
+    return metrics_response()
+
+@app.route("/selector-stats", methods=["GET"])
+def selector_stats():
+    """Hit rate and time spent per fallback selector"""
+    return jsonify(selector_cache.stats())
 
 @app.route("/download", methods=["GET"])
 def download_csv():
@@ -1,44 +1,86 @@
-import os
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-
-url = "https://www.westmetall.com/en/markdaten.php?action=table&field=LME_Al_cash"
-
-# Headers to avoid being blocked
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
-}
-
-# Send GET request
-r = requests.get(url, headers=headers)
-
-if r.status_code ==200:
-    # Parse the HTML content
-    soup = BeautifulSoup(r.text, "html.parser")
-
-# Find the table
-    table = soup.find("table")
-
-    # Extract table data
-    data = []
-    if table:
-        tbody = table.find("tbody")
-
-        if tbody:
-            rows = tbody.find_all("tr")
-            for row in rows[:1]:
-                columns = row.find_all("td")
-            if len(columns) > 1:
-                Date = columns[0].text.strip()
-                LME_Aluminium_Cash = columns[1].text.strip()
-                data.append([Date, LME_Aluminium_Cash])
-
-    df = pd.DataFrame(data, columns=["Date", "LME_Aluminium_Cash"])
-    write_header = not os.path.exists("scraped_csv/LME_Aluminium_Cash.csv")  # Write header only if file does not exist
-    df.to_csv("scraped_csv/LME_CSP_Scarp.csv", mode="a", index=False, header=write_header)
-
-    print("Scraping completed! Data saved to 'scraped_csv/LME_Aluminium_Cash.csv'.") 
-
-else:
-    print(f"Failed to fetch the page. Status Code: {r.status_code}")          
\ No newline at end of file
+import argparse
+from timeseries_store import TickStore, parse_number, parse_timestamp
+from http_client import HttpClient
+from csv_store import KeyedCsv
+from rate_sources import LME_CASH_URL, parse_lme_cash, parse_lme_cash_history
+
+url = LME_CASH_URL
+
+# Validators are kept on disk so the next run can skip an unchanged page
+http_client = HttpClient(validators_path="scraped_csv/http_validators.json", name="lme_cash")
+
+# One row per settlement date, rerunning on the same day writes nothing
+lme_cash_csv = KeyedCsv("scraped_csv/LME_CSP_Scarp.csv", ["Date", "LME_Aluminium_Cash"], key=["Date"])
+
+
+def scrape_latest():
+    # Send GET request
+    r = http_client.get(url)
+
+    if r.status_code == 304:
+        print("Page unchanged since the last run, nothing to scrape.")
+
+    elif r.status_code ==200:
+        # Parse the latest row of the table
+        data = parse_lme_cash(r.text)
+        if not data:
+            # Keep the next run from getting a 304 for a page we could not read
+            http_client.forget(url)
+            print("Failed to parse the price table, the next run will fetch the page in full.")
+            return
+
+        lme_cash_csv.upsert(data)
+
+        tick_store = TickStore()
+        for Date, LME_Aluminium_Cash in data:
+            tick_store.append("lme_cash", "aluminium", Date, LME_Aluminium_Cash)
+        tick_store.flush()
+
+        print("Scraping completed! Data saved to 'scraped_csv/LME_CSP_Scarp.csv'.")
+
+    else:
+        print(f"Failed to fetch the page. Status Code: {r.status_code}")
+
+
+def backfill():
+    """Load every settlement date on the archive page that is not stored yet.
+
+    Safe to rerun: dates already in the tick store are skipped, so later runs
+    only insert what was published since.
+    """
+    # Always fetch in full, a 304 from the daily run says nothing about what is stored
+    r = http_client.get(url, conditional=False)
+    if r.status_code != 200:
+        print(f"Failed to fetch the page. Status Code: {r.status_code}")
+        return
+
+    history = parse_lme_cash_history(r.text)
+
+    tick_store = TickStore()
+    stored = tick_store.timestamps("lme_cash", "aluminium")
+    new = {}
+    for Date, LME_Aluminium_Cash in history:
+        ts = parse_timestamp(Date)
+        if ts is None or ts in stored or parse_number(LME_Aluminium_Cash) is None:
+            continue
+        new.setdefault(ts, [Date, LME_Aluminium_Cash])
+
+    new_data = [new[ts] for ts in sorted(new)]
+    new_rows = [tick_store.make_row("lme_cash", "aluminium", ts, new[ts][1]) for ts in sorted(new)]
+    tick_store.insert_many(new_rows)
+    lme_cash_csv.upsert(new_data)
+    # Daily runs may already have appended newer dates: put the older ones in front of them
+    lme_cash_csv.sort(lambda row: parse_timestamp(row["Date"]) or "")
+
+    print(f"Backfill completed! {len(new_rows)} new settlement dates stored ({len(history)} rows in the archive).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the LME aluminium cash-settlement price")
+    parser.add_argument("--backfill", action="store_true",
+                        help="load the whole archive table instead of just the latest row")
+    args = parser.parse_args()
+    if args.backfill:
+        backfill()
+    else:
+        scrape_latest()
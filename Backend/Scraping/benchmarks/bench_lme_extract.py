@@ -0,0 +1,110 @@
+"""Benchmark the LME quote extraction paths against saved investing.com pages.
+
+Serves the fixtures in benchmarks/fixtures from a local HTTP server and
+times one full tick (fetch + extract) for:
+
+  * http      - pooled requests session + compiled lxml XPath
+  * selenium  - warm pooled Chrome session, reload + find_element
+
+Usage (from Backend/Scraping):
+    python benchmarks/bench_lme_extract.py --iterations 200
+    python benchmarks/bench_lme_extract.py --skip-selenium
+"""
+import argparse
+import functools
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPING_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, SCRAPING_DIR)
+
+from investing_quote import create_session, extract_quote, fetch_quote  # noqa: E402
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fixtures():
+    """Start a local HTTP server for the fixture directory, return its base URL"""
+    handler = functools.partial(QuietHandler, directory=FIXTURES_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def load_scraper():
+    """Import the LME scraper module without starting its Flask app"""
+    # The scraper creates scraped_csv/ relative to the cwd; keep that out of the repo
+    os.chdir(tempfile.mkdtemp(prefix="lme_bench_"))
+    path = os.path.join(SCRAPING_DIR, "3_months_LME_Aluminium_scrap.py")
+    spec = importlib.util.spec_from_file_location("lme_scraper", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run(name, tick, iterations):
+    tick()  # warm-up: connection / browser start is not part of steady state
+    samples = []
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        tick()
+        samples.append(time.perf_counter() - start)
+    cpu = time.process_time() - cpu_start
+    samples.sort()
+    print(
+        f"{name:<10} n={iterations:<5} "
+        f"p50={statistics.median(samples) * 1000:8.2f} ms  "
+        f"p99={samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000:8.2f} ms  "
+        f"cpu/tick={cpu / iterations * 1000:7.2f} ms (this process)"
+    )
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--skip-selenium", action="store_true")
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    page_url = f"{base_url}/investing_aluminum.html"
+    shell_url = f"{base_url}/investing_aluminum_client_rendered.html"
+
+    # Sanity check both fixtures before timing anything
+    with open(os.path.join(FIXTURES_DIR, "investing_aluminum.html"), "rb") as f:
+        print("Server-rendered fixture:", extract_quote(f.read()))
+    with open(os.path.join(FIXTURES_DIR, "investing_aluminum_client_rendered.html"), "rb") as f:
+        print("Client-rendered fixture:", extract_quote(f.read()), "(falls back to Selenium)")
+    print()
+
+    session = create_session()
+    run("http", lambda: fetch_quote(session, page_url), args.iterations)
+
+    if not args.skip_selenium:
+        scraper = load_scraper()
+        scraper.URL = page_url
+
+        def selenium_tick():
+            return scraper.scrape_with_driver()
+
+        run("selenium", selenium_tick, max(1, args.iterations // 10))
+        print("driver pool:", scraper.driver_pool.stats())
+        scraper.driver_pool.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
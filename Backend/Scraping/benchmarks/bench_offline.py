@@ -0,0 +1,455 @@
+"""End-to-end benchmark of every scraper against local stand-in sites.
+
+Serves the recorded pages in benchmarks/fixtures from a local HTTP server
+and points the scrapers at it through their URL settings (RBI_URL,
+SBI_TT_URL, LME_CASH_URL, LME_3M_URL, MCX_URL), so nothing hits
+investing.com, 5paisa, msei, officialforexrates or westmetall. A tick is
+one call of the scraper's own scrape function: fetch, parse, persist and
+publish.
+
+The stand-in serves every page under two routes:
+
+  /<fixture>            a new ETag on every request, so each tick is a full
+                        fetch + parse (the page changed upstream)
+  /unchanged/<fixture>  a stable ETag honouring If-None-Match, so steady
+                        state is a 304 (the page did not change)
+
+Modes (Chrome modes are skipped when no Chrome/Chromium is installed):
+
+  rbi, sbi_tt, lme_cash          Flask scrapers, full page every tick
+  <source>:unchanged             the same against an unchanged page
+  rates_collector[:unchanged]    one aiohttp collect() round of all three
+  lme_3m:http                    server-rendered quote over plain HTTP
+  lme_3m:fallback                client-rendered page, HTTP miss -> Chrome
+  lme_3m:selenium                always Chrome
+  mcx:serial, mcx:parallel       5paisa stand-in, MCX_PARALLEL_CONTRACTS=0/1
+
+Each mode runs in a fresh subprocess with its own working directory:
+
+  cold_ms      first tick (connection setup, browser start)
+  p50/p99_ms   steady-state tick latency
+  cpu_ms       CPU time per steady-state tick of the scraper process
+  cpu_total_s  CPU of the whole run, including the browser processes
+  rss_kb       peak RSS of the scraper process
+  browser_kb   peak RSS of the largest browser/driver process
+
+--json writes the results with the commit they were measured on; pass a
+previous file to --compare to print the change per mode.
+
+Usage (from Backend/Scraping):
+    python benchmarks/bench_offline.py --iterations 100
+    python benchmarks/bench_offline.py --modes rbi rbi:unchanged --latency 40
+    python benchmarks/bench_offline.py --json offline_after.json --compare offline_before.json
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import itertools
+import json
+import mimetypes
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPING_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+# URL setting of each scraper -> the page the stand-in serves for it
+FIXTURES = {
+    "RBI_URL": "msei_rbi_reference_rates.html",
+    "SBI_TT_URL": "officialforexrates.html",
+    "LME_CASH_URL": "westmetall_lme_al_cash.html",
+    "LME_3M_URL": "investing_aluminum.html",
+    "MCX_URL": "5paisa_mcx_aluminium.html",
+}
+
+MODES = {
+    "rbi": {"scraper": "rbi"},
+    "rbi:unchanged": {"scraper": "rbi", "unchanged": True},
+    "sbi_tt": {"scraper": "sbi_tt"},
+    "sbi_tt:unchanged": {"scraper": "sbi_tt", "unchanged": True},
+    "lme_cash": {"scraper": "lme_cash"},
+    "lme_cash:unchanged": {"scraper": "lme_cash", "unchanged": True},
+    "rates_collector": {"scraper": "rates_collector"},
+    "rates_collector:unchanged": {"scraper": "rates_collector", "unchanged": True},
+    "lme_3m:http": {"scraper": "lme_3m", "env": {"LME_SCRAPE_MODE": "http"}},
+    "lme_3m:fallback": {
+        "scraper": "lme_3m", "env": {"LME_SCRAPE_MODE": "http"}, "browser": True,
+        "fixtures": {"LME_3M_URL": "investing_aluminum_client_rendered.html"},
+    },
+    "lme_3m:selenium": {"scraper": "lme_3m", "env": {"LME_SCRAPE_MODE": "selenium"}, "browser": True},
+    "mcx:serial": {"scraper": "mcx", "env": {"MCX_PARALLEL_CONTRACTS": "0"}, "browser": True},
+    "mcx:parallel": {"scraper": "mcx", "env": {"MCX_PARALLEL_CONTRACTS": "1"}, "browser": True},
+}
+
+BROWSERS = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real sites
+    # Headers and body go out in separate writes; without this Nagle + delayed
+    # ACK add ~40 ms to every response and swamp what is being measured
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        unchanged = path.startswith("/unchanged/")
+        if unchanged:
+            path = path[len("/unchanged"):]
+        body = self.server.page(path)
+        if body is None:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if unchanged:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            if self.headers.get("If-None-Match") == etag:
+                self.server.count(304)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+        version = self.server.count(200)
+        if not unchanged:
+            etag = '"v%d"' % version
+
+        self.send_response(200)
+        self.send_header("Content-Type", mimetypes.guess_type(path)[0] or "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serves the fixtures (read once) and counts the responses it sent"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._versions = itertools.count(1)
+        self.responses = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def page(self, path):
+        if path not in self._pages:
+            file_path = os.path.normpath(os.path.join(FIXTURES_DIR, path.lstrip("/")))
+            if not file_path.startswith(FIXTURES_DIR + os.sep) or not os.path.isfile(file_path):
+                return None
+            with open(file_path, "rb") as f:
+                self._pages[path] = f.read()
+        return self._pages[path]
+
+    def count(self, status):
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            return next(self._versions)
+
+    def reset(self):
+        with self._lock:
+            responses, self.responses = self.responses, {}
+        return responses
+
+
+def find_browser():
+    for name in BROWSERS:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+
+def load_module(filename, name):
+    """Import a scraper by file name (some start with a digit) without starting its Flask app"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRAPING_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scraper_rbi():
+    import rbi_scrap
+
+    return rbi_scrap.scrape_rbi_rates, bool, rbi_scrap.tick_store.flush, None
+
+
+def scraper_sbi_tt():
+    import sbitt_scrap
+
+    return sbitt_scrap.scrape_sbi_tt_sell, bool, sbitt_scrap.tick_store.flush, None
+
+
+def scraper_lme_cash():
+    import LME_CSP_scrap
+
+    # scrape_latest() only prints; the CSV it writes on the first tick is the check
+    def check(_):
+        return os.path.exists(LME_CSP_scrap.lme_cash_csv.path)
+
+    return LME_CSP_scrap.scrape_latest, check, None, None
+
+
+def scraper_rates_collector():
+    import rates_collector
+
+    loop = asyncio.new_event_loop()
+
+    async def open_session():
+        return rates_collector.create_http_session()
+
+    session = loop.run_until_complete(open_session())
+    sources = list(rates_collector.SOURCES.values())
+
+    async def collect_all():
+        return await asyncio.gather(*(source.collect(session) for source in sources))
+
+    def tick():
+        return loop.run_until_complete(collect_all())
+
+    def check(_):
+        return all(source.data for source in sources)
+
+    def close():
+        loop.run_until_complete(session.close())
+        loop.close()
+        rates_collector.tick_store.flush()
+
+    return tick, check, close, None
+
+
+def scraper_lme_3m():
+    module = load_module("3_months_LME_Aluminium_scrap.py", "lme_scraper")
+
+    def check(ok):
+        return ok and not module.latest_data.get("error")
+
+    def stats():
+        return {"mode_counts": module.mode_counts, "driver_pool": module.driver_pool.stats()}
+
+    return module.scrape_data, check, module.driver_pool.close, stats
+
+
+def scraper_mcx():
+    module = load_module("3_months_MCX_aluminium_scrap.py", "mcx_scraper")
+
+    def check(data):
+        prices = data.get("prices") or {}
+        return "error" not in data and bool(prices) and all(p["price"] != "N/A" for p in prices.values())
+
+    def close():
+        if module.contract_executor is not None:
+            module.contract_executor.shutdown()
+        module.driver_pool.close()
+
+    def stats():
+        return {"driver_pool": module.driver_pool.stats()}
+
+    return module.scrape_data, check, close, stats
+
+
+SCRAPERS = {
+    "rbi": scraper_rbi,
+    "sbi_tt": scraper_sbi_tt,
+    "lme_cash": scraper_lme_cash,
+    "rates_collector": scraper_rates_collector,
+    "lme_3m": scraper_lme_3m,
+    "mcx": scraper_mcx,
+}
+
+
+def worker(mode, iterations):
+    """Measure one mode in this process (cwd is a scratch dir) and print the result as JSON"""
+    sys.path.insert(0, SCRAPING_DIR)
+    os.makedirs("scraped_csv", exist_ok=True)
+    # (tick, check(result) -> bool, close or None, stats or None)
+    tick, check, close, stats = SCRAPERS[MODES[mode]["scraper"]]()
+
+    started = time.perf_counter()
+    result = tick()
+    cold = time.perf_counter() - started
+    if not check(result):
+        sys.exit(f"{mode}: the first tick against the stand-in returned no data: {result!r}")
+
+    samples = []
+    failures = 0
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = tick()
+        samples.append(time.perf_counter() - start)
+        failures += not check(result)
+    cpu = time.process_time() - cpu_start
+    samples.sort()
+
+    info = stats() if stats else {}
+    if close:
+        close()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    browser = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+    print(json.dumps({
+        "mode": mode,
+        "iterations": iterations,
+        "failures": failures,
+        "cold_ms": round(cold * 1000, 3),
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "cpu_ms": round(cpu / iterations * 1000, 3),
+        "rss_kb": rss,  # ru_maxrss is in KiB on Linux
+        "browser_kb": browser,
+        "info": info,
+    }))
+
+
+def run_mode(server, mode, iterations, timeout):
+    """Run one mode in a subprocess pointed at the stand-in; returns its result dict"""
+    spec = MODES[mode]
+    prefix = "/unchanged/" if spec.get("unchanged") else "/"
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", **spec.get("env", {}))
+    for setting, fixture in {**FIXTURES, **spec.get("fixtures", {})}.items():
+        env[setting] = f"{server.base_url}{prefix}{fixture}"
+
+    workdir = tempfile.mkdtemp(prefix="offline_bench_")
+    server.reset()
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", mode, "--iterations", str(iterations)],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"mode": mode, "error": f"timed out after {timeout}s"}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    responses = server.reset()
+
+    if completed.returncode != 0:
+        lines = (completed.stderr or completed.stdout).strip().splitlines()
+        return {"mode": mode, "error": lines[-1] if lines else f"exit status {completed.returncode}"}
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["cpu_total_s"] = round(
+        (children_after.ru_utime - children_before.ru_utime) + (children_after.ru_stime - children_before.ru_stime), 3
+    )
+    result["responses"] = {str(status): count for status, count in sorted(responses.items())}
+    return result
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=SCRAPING_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return git("rev-parse", "--short", "HEAD") or None, bool(git("status", "--porcelain", "--", "."))
+    except OSError:
+        return None, None
+
+
+def print_result(result, baseline=None):
+    mode = result["mode"]
+    if "skipped" in result or "error" in result:
+        print(f"{mode:<26} {'skipped' if 'skipped' in result else 'ERROR'}: {result.get('skipped') or result['error']}")
+        return
+
+    def delta(key):
+        if not baseline or not baseline.get(key):
+            return ""
+        return f" ({(result[key] - baseline[key]) / baseline[key] * 100:+.0f}%)"
+
+    print(
+        f"{mode:<26} cold={result['cold_ms']:9.1f} ms  "
+        f"p50={result['p50_ms']:8.2f} ms{delta('p50_ms')}  p99={result['p99_ms']:8.2f} ms{delta('p99_ms')}  "
+        f"cpu/tick={result['cpu_ms']:7.2f} ms{delta('cpu_ms')}  cpu_total={result['cpu_total_s']:6.2f} s  "
+        f"rss={result['rss_kb'] // 1024:>4} MiB{delta('rss_kb')}  browser={result['browser_kb'] // 1024:>4} MiB  "
+        f"responses={result['responses']}" + (f"  failures={result['failures']}" if result["failures"] else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--browser-iterations", type=int, default=None,
+                        help="iterations of the Chrome modes (default: --iterations / 10, at least 3)")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--latency", type=float, default=0, help="milliseconds the stand-in waits per response")
+    parser.add_argument("--timeout", type=float, default=900, help="seconds allowed per mode")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--worker", metavar="MODE", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.iterations)
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        baseline = {result["mode"]: result for result in previous["results"]}
+        print(f"Comparing against {args.compare} (commit {previous['meta'].get('commit')})")
+
+    browser = find_browser()
+    browser_iterations = args.browser_iterations or max(3, args.iterations // 10)
+    server = StandInServer(latency=args.latency / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Stand-in sites on {server.base_url} (latency {args.latency:g} ms), browser: {browser or 'none'}")
+
+    results = []
+    for mode in args.modes:
+        if MODES[mode].get("browser") and not browser:
+            result = {"mode": mode, "skipped": "no Chrome/Chromium found"}
+        else:
+            iterations = browser_iterations if MODES[mode].get("browser") else args.iterations
+            result = run_mode(server, mode, iterations, args.timeout)
+        results.append(result)
+        print_result(result, baseline.get(mode))
+    server.shutdown()
+
+    if args.json:
+        commit, dirty = git_revision()
+        meta = {
+            "commit": commit,
+            "dirty": dirty,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "browser": browser,
+            "iterations": args.iterations,
+            "browser_iterations": browser_iterations,
+            "latency_ms": args.latency,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark the HTML table parser backends on saved reference-rate pages.
+
+Runs the rate_sources parsers over the fixtures in benchmarks/fixtures with
+every table_parser backend, plus ``bs4-full`` - the previous approach of
+building a complete BeautifulSoup(html.parser) tree of the page:
+
+  rbi          msei_rbi_reference_rates.html  parse_rbi_rates
+  sbi_tt       officialforexrates.html        parse_sbi_tt_sell
+  lme_cash     westmetall_lme_al_cash.html    parse_lme_cash
+  lme_history  westmetall_lme_al_cash.html    parse_lme_cash_history
+
+Each case runs in its own subprocess so the peak-memory numbers do not
+leak between backends: ``rss`` is the growth of the process's peak RSS
+during one cold parse, ``py_peak`` the tracemalloc peak (Python objects
+only, lxml/lexbor buffers are not included).
+
+Usage (from Backend/Scraping):
+    python benchmarks/bench_parsers.py --iterations 200
+    python benchmarks/bench_parsers.py --json parse_results.json
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRAPING_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+sys.path.insert(0, SCRAPING_DIR)
+
+import rate_sources  # noqa: E402
+import table_parser  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+CASES = {
+    "rbi": ("msei_rbi_reference_rates.html", rate_sources.parse_rbi_rates),
+    "sbi_tt": ("officialforexrates.html", rate_sources.parse_sbi_tt_sell),
+    "lme_cash": ("westmetall_lme_al_cash.html", rate_sources.parse_lme_cash),
+    "lme_history": ("westmetall_lme_al_cash.html", rate_sources.parse_lme_cash_history),
+}
+
+
+def tables_bs4_full(page_html, first_only):
+    """Baseline: full html.parser tree of the whole page, as the scrapers used to build"""
+    soup = BeautifulSoup(page_html, "html.parser")
+    nodes = [soup.find("table")] if first_only else soup.find_all("table")
+    tables = []
+    for node in nodes:
+        if node is None:
+            continue
+        table = table_parser.Table()
+        for row in node.find_all("tr"):
+            cells = [cell.get_text().strip() for cell in row.find_all("td", recursive=False)]
+            table.rows.append(cells)
+            if row.parent.name == "thead":
+                table.head.append([cell.get_text().strip() for cell in row.find_all("th", recursive=False)])
+            elif row.parent.name == "tbody":
+                table.body.append(cells)
+        tables.append(table)
+    return tables
+
+
+table_parser.BACKENDS["bs4-full"] = tables_bs4_full
+
+
+def backends():
+    return ["bs4-full"] + [name for name in table_parser.available_backends() if name != "bs4-full"]
+
+
+def worker(case, backend, iterations):
+    """Measure one case/backend in this process and print the result as JSON"""
+    fixture, parse = CASES[case]
+    with open(os.path.join(FIXTURES_DIR, fixture), encoding="utf-8") as f:
+        page_html = f.read()
+
+    # Cold call first so its memory high-water mark is not hidden by a warm-up
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = parse(page_html, backend)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    parse(page_html, backend)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        parse(page_html, backend)
+        samples.append(time.perf_counter() - start)
+    cpu = time.process_time() - cpu_start
+    samples.sort()
+
+    print(json.dumps({
+        "case": case,
+        "backend": backend,
+        "page_kb": round(len(page_html.encode("utf-8")) / 1024, 1),
+        "rows": len(result or []),
+        "iterations": iterations,
+        "p50_ms": round(statistics.median(samples) * 1000, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+        "cpu_ms": round(cpu / iterations * 1000, 3),
+        "rss_kb": rss_after - rss_before,  # ru_maxrss is in KiB on Linux
+        "py_peak_kb": round(py_peak / 1024, 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--cases", nargs="*", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--backends", nargs="*", default=None)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--worker", nargs=2, metavar=("CASE", "BACKEND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker, args.iterations)
+        return
+
+    results = []
+    for case in args.cases:
+        for backend in args.backends or backends():
+            # bs4 on the multi-year westmetall page takes ~1 s a call; keep the run time sane
+            slow = backend.startswith("bs4") and CASES[case][0].startswith("westmetall")
+            iterations = max(5, args.iterations // 10) if slow else args.iterations
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", case, backend,
+                 "--iterations", str(iterations)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{case:<12} {backend:<11} rows={result['rows']:<5} "
+                f"p50={result['p50_ms']:8.2f} ms  p99={result['p99_ms']:8.2f} ms  "
+                f"rss=+{result['rss_kb']:>6} KiB  py_peak={result['py_peak_kb']:>8} KiB"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
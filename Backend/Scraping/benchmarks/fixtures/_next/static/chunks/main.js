@@ -0,0 +1,30 @@
+// Stand-in for the investing.com client bundle loaded by
+// investing_aluminum_client_rendered.html: after a short delay (the live
+// bundle hydrates the quote from an API call) it replaces the skeleton with
+// the same quote markup investing_aluminum.html has server-rendered.
+(function () {
+  var RENDER_DELAY_MS = 250;
+
+  function render() {
+    var placeholder = document.querySelector("[data-test='instrument-price-placeholder']");
+    if (!placeholder) {
+      return;
+    }
+    var quote = document.createElement("div");
+    quote.className = "instrument-price_instrument-price";
+    quote.innerHTML =
+      '<div class="text-5xl/9 font-bold" data-test="instrument-price-last">2,421.70</div>' +
+      '<div class="instrument-price_change-wrapper">' +
+      '<span class="instrument-price_change" data-test="instrument-price-change">-34.35</span> ' +
+      '<span class="instrument-price_change-percent" data-test="instrument-price-change-percent">(-1.40%)</span>' +
+      '</div>' +
+      '<time data-test="trading-time-label">13:18:28</time>';
+    placeholder.replaceWith(quote);
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", function () { setTimeout(render, RENDER_DELAY_MS); });
+  } else {
+    setTimeout(render, RENDER_DELAY_MS);
+  }
+})();
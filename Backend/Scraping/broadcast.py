@@ -0,0 +1,198 @@
+import json
+import queue
+import threading
+import time
+
+from metrics import SSE_FANOUT_SECONDS
+
+
+def format_sse(data, event=None, event_id=None):
+    """Serialize data into a single Server-Sent Events frame"""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    frame = f"data: {payload}\n\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n{frame}"
+    if event:
+        frame = f"event: {event}\n{frame}"
+    return frame
+
+
+def diff_snapshot(old, new):
+    """Nested dict of the values in new that differ from old.
+
+    Returns None when a key disappeared (e.g. a contract month rolled off),
+    since a partial update cannot express a removal; callers then resend
+    the full snapshot.
+    """
+    changes = {}
+    for key in old:
+        if key not in new:
+            return None
+    for key, value in new.items():
+        previous = old.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = diff_snapshot(previous, value)
+            if nested is None:
+                return None
+            if nested:
+                changes[key] = nested
+        elif key not in old or previous != value:
+            changes[key] = value
+    return changes
+
+
+class Broadcaster:
+    """Fan out each update to every SSE subscriber through its own bounded queue.
+
+    A tick is serialized once in publish() and the same frame is handed to
+    all subscribers. When a subscriber's queue is full (a slow client) its
+    oldest frame is dropped so the newest one still gets through; publishers
+    never block on a slow reader.
+    """
+
+    def __init__(self, max_queue=8, heartbeat=15, name="stream"):
+        self.name = name
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.published = 0
+        self.coalesced = 0
+
+    def add_listener(self, callback):
+        """Also hand every published value to callback(data), e.g. a shared cache"""
+        self._listeners.append(callback)
+
+    def _notify(self, data):
+        for callback in self._listeners:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"⚠️ Broadcast listener failed: {e}")
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, data, event=None):
+        """Serialize data once and push the frame to every subscriber"""
+        self._notify(data)
+        return self.publish_frame(format_sse(data, event))
+
+    def publish_frame(self, frame):
+        """Push an already formatted SSE frame to every subscriber"""
+        started = time.perf_counter()
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for q in subscribers:
+            self._offer(q, frame)
+        SSE_FANOUT_SECONDS.observe(time.perf_counter() - started, stream=self.name)
+        return len(subscribers)
+
+    def _offer(self, q, frame):
+        while True:
+            try:
+                q.put_nowait(frame)
+                return
+            except queue.Full:
+                # Slow client: drop its oldest pending frame and retry
+                try:
+                    q.get_nowait()
+                    with self._lock:
+                        self.coalesced += 1
+                except queue.Empty:
+                    pass
+
+    def stream(self, initial=None, q=None):
+        """Generator for a Flask streaming Response
+
+        Yields ``initial`` (an already formatted frame) first, then every
+        published frame as soon as it arrives. An SSE comment is sent when
+        idle so proxies keep the connection open; EventSource ignores it.
+        Pass ``q`` when the subscription was taken out ahead of time.
+        """
+        q = q or self.subscribe()
+        try:
+            if initial:
+                yield initial
+            while True:
+                try:
+                    yield q.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+        finally:
+            self.unsubscribe(q)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "coalesced": self.coalesced,
+            }
+
+
+class DeltaBroadcaster(Broadcaster):
+    """Broadcaster that only pushes what changed since the previous snapshot.
+
+    New clients get the full snapshot as a normal ``message`` event whose SSE
+    id is the current sequence number. After that only ``delta`` events are
+    sent, carrying ``{"seq": n, "changes": {...}}`` with just the changed
+    fields; a tick that changes nothing sends nothing (clients still get the
+    idle heartbeat comment).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._state_lock = threading.Lock()
+        self._snapshot = None
+        self.seq = 0
+
+    def publish_changes(self, snapshot):
+        """Publish the difference to the last snapshot; returns the frame type sent"""
+        with self._state_lock:
+            if self._snapshot is None:
+                changes = None
+            else:
+                changes = diff_snapshot(self._snapshot, snapshot)
+                if changes == {}:
+                    return None
+            self.seq += 1
+            self._snapshot = json.loads(json.dumps(snapshot))
+            self._notify(self._snapshot)
+            if changes is None:
+                # First snapshot or a removed key: resend everything
+                self.publish_frame(format_sse(snapshot, event_id=self.seq))
+                return "snapshot"
+            self.publish_frame(format_sse({"seq": self.seq, "changes": changes}, event="delta", event_id=self.seq))
+            return "delta"
+
+    def _offer(self, q, frame):
+        try:
+            q.put_nowait(frame)
+        except queue.Full:
+            # Dropping a delta would leave the client out of sync, so a slow
+            # client's backlog is replaced by one full snapshot instead
+            while True:
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    break
+            with self._lock:
+                self.coalesced += 1
+            q.put_nowait(format_sse(self._snapshot, event_id=self.seq))
+
+    def stream_with_snapshot(self):
+        """Subscribe and capture the snapshot atomically so no delta is missed"""
+        with self._state_lock:
+            q = self.subscribe()
+            initial = format_sse(self._snapshot, event_id=self.seq) if self._snapshot else None
+        return self.stream(initial, q)
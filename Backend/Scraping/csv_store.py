@@ -0,0 +1,208 @@
+"""Idempotent CSV persistence for the scrapers' history files.
+
+The scrapers used to append a row on every call, so the CSVs grew with
+traffic instead of with data. Two writers replace those appends:
+
+* KeyedCsv keeps one row per key (e.g. the publication date of a daily
+  rate): new keys are appended, a changed value rewrites the file, and an
+  unchanged value writes nothing.
+* ChangeLog is for tick series keyed on our own scrape time: a row is only
+  appended when the quoted fields differ from the last stored row.
+
+Existing files are deduplicated once with:
+    python csv_store.py --compact
+"""
+import argparse
+import csv
+import os
+
+from snapshot import read_last_csv_row
+
+
+def _read_rows(path, fieldnames):
+    """Rows of an existing CSV as dicts over fieldnames (short rows padded)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header, replaced by fieldnames
+        return [dict(zip(fieldnames, row + [""] * (len(fieldnames) - len(row))))
+                for row in reader if row]
+
+
+def _write_rows(path, fieldnames, rows):
+    """Atomically rewrite the whole file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def _append_rows(path, fieldnames, rows):
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator="\n")
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def _normalise(row, fieldnames):
+    """Row as a dict of strings over fieldnames; accepts dicts or sequences"""
+    if not isinstance(row, dict):
+        row = dict(zip(fieldnames, row))
+    return {field: "" if row.get(field) is None else str(row.get(field)) for field in fieldnames}
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class KeyedCsv:
+    """CSV holding one row per key; upsert() only touches the file on a change.
+
+    Rows are reloaded before a write when the file changed since this
+    instance last read or wrote it, so another writer's rows (e.g.
+    LME_CSP_scrap.py run by cron next to the rates collector) are not lost
+    when the file is rewritten.
+    """
+
+    def __init__(self, path, fieldnames, key):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.key = tuple(key)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._load()
+
+    def _load(self):
+        self._rows = {}
+        for row in _read_rows(self.path, self.fieldnames):
+            self._rows[self._key_of(row)] = row
+        self._state = _file_state(self.path)
+
+    def _reload_if_changed(self):
+        if _file_state(self.path) != self._state:
+            self._load()
+
+    def _key_of(self, row):
+        return tuple(row[field] for field in self.key)
+
+    def upsert(self, rows):
+        """Insert or update rows; returns how many rows changed"""
+        self._reload_if_changed()
+        appended, replaced = [], False
+        for row in rows:
+            row = _normalise(row, self.fieldnames)
+            key = self._key_of(row)
+            existing = self._rows.get(key)
+            if existing == row:
+                continue
+            if existing is None:
+                appended.append(row)
+            else:
+                replaced = True
+            self._rows[key] = row
+
+        if replaced:
+            _write_rows(self.path, self.fieldnames, self._rows.values())
+        elif appended:
+            _append_rows(self.path, self.fieldnames, appended)
+        if replaced or appended:
+            self._state = _file_state(self.path)
+        return len(appended) + (1 if replaced else 0)
+
+    def get(self, key):
+        return self._rows.get(tuple(key))
+
+    def sort(self, key):
+        """Rewrite the file with its rows ordered by key(row); returns False if already in order"""
+        self._reload_if_changed()
+        rows = list(self._rows.values())
+        ordered = sorted(rows, key=key)
+        if ordered == rows:
+            return False
+        self._rows = {self._key_of(row): row for row in ordered}
+        _write_rows(self.path, self.fieldnames, ordered)
+        self._state = _file_state(self.path)
+        return True
+
+
+class ChangeLog:
+    """Append-only CSV that skips a row when ``compare`` fields match the last one"""
+
+    def __init__(self, path, fieldnames, compare):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.compare = tuple(compare)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            _write_rows(path, self.fieldnames, [])
+        last = read_last_csv_row(path)
+        self._last = _normalise(last, self.fieldnames) if last else None
+
+    def append(self, row):
+        """Append row unless nothing changed; returns True if it was written"""
+        row = _normalise(row, self.fieldnames)
+        if self._last and all(row[field] == self._last[field] for field in self.compare):
+            return False
+        _append_rows(self.path, self.fieldnames, [row])
+        self._last = row
+        return True
+
+
+def compact(path, fieldnames, key=None, compare=None):
+    """Deduplicate an existing file in place; returns (rows before, rows after)
+
+    With ``key`` the last row per key is kept (in first-seen order); with
+    ``compare`` consecutive rows with the same compared fields collapse into
+    the first of them.
+    """
+    rows = _read_rows(path, fieldnames)
+    if key:
+        kept = {}
+        for row in rows:
+            kept[tuple(row[field] for field in key)] = row
+        compacted = list(kept.values())
+    else:
+        compacted = []
+        for row in rows:
+            if compacted and all(row[field] == compacted[-1][field] for field in compare):
+                continue
+            compacted.append(row)
+    _write_rows(path, fieldnames, compacted)
+    return len(rows), len(compacted)
+
+
+# History files written by the scrapers, with how each one is deduplicated
+HISTORY_FILES = {
+    "scraped_csv/sbitt.csv": {"fieldnames": ["date", "sbi_tt_sell"], "key": ["date"]},
+    "scraped_csv/LME_CSP_Scarp.csv": {"fieldnames": ["Date", "LME_Aluminium_Cash"], "key": ["Date"]},
+    "scraped_csv/3_months_LME_scrap.csv": {
+        "fieldnames": ["Value", "Time Span", "Rate of Change", "Timestamp"],
+        "compare": ["Value", "Time Span", "Rate of Change"],
+    },
+}
+
+
+def compact_history_files():
+    for path, spec in HISTORY_FILES.items():
+        if not os.path.exists(path):
+            continue
+        before, after = compact(path, **spec)
+        print(f"✅ {path}: {before} -> {after} rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the scrapers' CSV history files")
+    parser.add_argument("--compact", action="store_true", help="deduplicate the existing history files")
+    args = parser.parse_args()
+    if args.compact:
+        compact_history_files()
+    else:
+        parser.print_help()
@@ -0,0 +1,66 @@
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Counts DOM mutations from now on so we can tell when the page has re-rendered
+_ARM_WATCH_JS = """
+if (window.__domWatch) { window.__domWatch.observer.disconnect(); }
+const watch = {count: 0, last: performance.now()};
+watch.observer = new MutationObserver(() => { watch.count++; watch.last = performance.now(); });
+watch.observer.observe(document.body, {subtree: true, childList: true, characterData: true});
+window.__domWatch = watch;
+"""
+
+# Text of the first node matching any of the XPaths, plus the mutation counters
+_READ_STATE_JS = """
+let text = null;
+for (const xpath of arguments[0]) {
+    const node = document.evaluate(xpath, document, null,
+        XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    if (node && node.textContent.trim()) { text = node.textContent.trim(); break; }
+}
+const watch = window.__domWatch || {count: 0, last: performance.now()};
+return {text: text, mutations: watch.count, idle_ms: performance.now() - watch.last};
+"""
+
+_DISARM_WATCH_JS = """
+if (window.__domWatch) { window.__domWatch.observer.disconnect(); window.__domWatch = null; }
+"""
+
+
+def read_text(driver, xpaths):
+    """Text of the first node matching xpaths, read in one round-trip"""
+    return driver.execute_script(_READ_STATE_JS, list(xpaths))["text"]
+
+
+def arm_mutation_watch(driver):
+    """Start counting DOM mutations; call right before the action that updates the page"""
+    driver.execute_script(_ARM_WATCH_JS)
+
+
+def wait_for_update(driver, xpaths, previous_text, timeout=3.0, settle=0.2, poll=0.05):
+    """Block until the watched node shows new text or the DOM settles after changing.
+
+    Returns as soon as the text under ``xpaths`` differs from ``previous_text``.
+    If the new value happens to equal the old one, returns once mutations were
+    seen and the DOM has been quiet for ``settle`` seconds. ``timeout`` is the
+    ceiling. Returns the seconds spent waiting.
+    """
+    started = time.perf_counter()
+
+    def updated(d):
+        state = d.execute_script(_READ_STATE_JS, list(xpaths))
+        if state["text"] and state["text"] != previous_text:
+            return True
+        return state["mutations"] > 0 and state["idle_ms"] >= settle * 1000
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(updated)
+    except TimeoutException:
+        print(f"⚠️ No DOM update within {timeout}s, continuing")
+    finally:
+        try:
+            driver.execute_script(_DISARM_WATCH_JS)
+        except Exception:
+            pass
+    return time.perf_counter() - started
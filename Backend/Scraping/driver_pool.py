@@ -0,0 +1,127 @@
+import threading
+from collections import deque
+
+from metrics import stage
+
+
+class DriverPool:
+    """Keep warm WebDriver sessions alive between scrapes.
+
+    Drivers are created lazily through ``factory`` and handed back to the
+    pool after every scrape. A driver is only thrown away when it fails a
+    health check (or after ``max_uses`` scrapes, to cap Chrome memory growth).
+    """
+
+    def __init__(self, factory, size=1, max_uses=1000, latency_window=200, name="driver"):
+        self.factory = factory
+        self.name = name
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = deque()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._latencies = deque(maxlen=latency_window)
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    def acquire(self):
+        """Return a healthy driver, reusing an idle one when possible"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    driver = self._idle.popleft() if self._idle else None
+                if driver is None:
+                    break
+                if self.is_healthy(driver):
+                    with self._lock:
+                        self.reused += 1
+                    return driver
+                self._discard(driver)
+
+            with stage(self.name, "driver_start"):
+                driver = self.factory()
+            if driver is None:
+                raise RuntimeError("Driver factory returned no driver")
+            with self._lock:
+                self.created += 1
+                self._uses[id(driver)] = 0
+            return driver
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver):
+        """Hand a driver back; keep it if it is still usable"""
+        try:
+            if driver is None:
+                return
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+            if uses >= self.max_uses or not self.is_healthy(driver):
+                self._discard(driver)
+                return
+            with self._lock:
+                self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def is_healthy(driver):
+        """Cheap liveness probe: one round-trip to the browser"""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+            self.recycled += 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        print("♻️ Recycled WebDriver session")
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def stats(self):
+        """Return reuse counters and recent per-scrape latency (seconds)"""
+        with self._lock:
+            last = self._latencies[-1] if self._latencies else None
+            latencies = sorted(self._latencies)
+            stats = {
+                "pool_size": self.size,
+                "idle": len(self._idle),
+                "created": self.created,
+                "reused": self.reused,
+                "recycled": self.recycled,
+                "scrapes": len(latencies),
+            }
+        if latencies:
+            stats["latency"] = {
+                "last": round(last, 3),
+                "avg": round(sum(latencies) / len(latencies), 3),
+                "p50": round(latencies[len(latencies) // 2], 3),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                "max": round(latencies[-1], 3),
+            }
+        return stats
+
+    def close(self):
+        """Quit every idle driver (call on shutdown)"""
+        with self._lock:
+            drivers = list(self._idle)
+            self._idle.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
@@ -0,0 +1,438 @@
+"""One ASGI application in front of every scraper service.
+
+Each Flask service is mounted unchanged under its own prefix:
+
+    /rbi       rbi_scrap.py                      (was :5000)
+    /sbi       sbitt_scrap.py                    (was :5001)
+    /mcx       3_months_MCX_aluminium_scrap.py   (was :5002)
+    /lme       3_months_LME_Aluminium_scrap.py   (was :5003)
+    /whatsapp  ../Whatsapp-Scraping/app.py       (was :3232)
+    /rates     rates_collector.py routes         (was :5004)
+
+so e.g. http://localhost:5005/lme/data replaces http://localhost:5003/data.
+The scraper loops run as background tasks, and every new value goes into
+one LatestCache. The routes that only serve the latest value (and the
+SSE streams, which would otherwise hold a Flask thread per client) are
+answered from that cache by async handlers:
+
+    GET /latest[/<source>]     latest value of every (or one) source
+    GET /stream?source=a,b     SSE, one ``event: <source>`` frame per update
+    WS  /ws?source=a,b         the same updates as JSON messages
+
+/mcx/stream keeps the MCX service's snapshot + ``delta`` protocol. While the
+rates collector runs, it alone fetches and writes the daily rates; /rbi/scrape
+and /sbi/scrape-sbi-tt serve its values instead of scraping on demand.
+
+Several workers are supported: one of them (whichever holds
+scraped_csv/gateway.lock) runs the scrapers, and the others pick the values
+up from the cache files. In-process state of the mounted Flask apps (e.g.
+WhatsApp's tick ring buffer) is still per worker.
+
+Run with:
+    uvicorn gateway:app --host 0.0.0.0 --port 5005 --workers 4
+or  python gateway.py  (GATEWAY_PORT, GATEWAY_WORKERS)
+"""
+import asyncio
+import importlib
+import json
+import os
+import sys
+import threading
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from broadcast import diff_snapshot, format_sse
+from latest_cache import LatestCache
+from metrics import CONTENT_TYPE, render
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single worker is always the leader
+    fcntl = None
+
+WHATSAPP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Whatsapp-Scraping")
+# Keep the WhatsApp database where app.py puts it when started from its own directory
+os.environ.setdefault("WHATSAPP_DB", os.path.join(WHATSAPP_DIR, "data", "whatsapp_prices.db"))
+# Only the leader re-queues unprocessed WhatsApp messages
+os.environ.setdefault("WHATSAPP_RECOVER", "0")
+
+# Mount prefix -> module exposing a Flask ``app``
+SERVICES = {
+    "rbi": "rbi_scrap",
+    "sbi": "sbitt_scrap",
+    "mcx": "3_months_MCX_aluminium_scrap",
+    "lme": "3_months_LME_Aluminium_scrap",
+    "whatsapp": "app",
+}
+ENABLED = [name for name in os.getenv("GATEWAY_SERVICES", ",".join([*SERVICES, "rates"])).split(",") if name]
+# Background scrapers the leader runs; GATEWAY_SCRAPERS= (empty) serves cached values only
+SCRAPERS = [name for name in os.getenv("GATEWAY_SCRAPERS", "mcx,lme,rates").split(",") if name]
+
+PORT = int(os.getenv("GATEWAY_PORT", "5005"))
+WORKERS = int(os.getenv("GATEWAY_WORKERS", "1"))
+SYNC_INTERVAL = float(os.getenv("GATEWAY_SYNC_INTERVAL", "0.5"))
+LEADER_RETRY = 5.0
+HEARTBEAT = 15
+LOCK_PATH = os.path.join("scraped_csv", "gateway.lock")
+
+cache = LatestCache()
+modules = {}
+
+
+def load_services():
+    if "whatsapp" in ENABLED and WHATSAPP_DIR not in sys.path:
+        sys.path.append(WHATSAPP_DIR)
+    for name, module_name in SERVICES.items():
+        if name not in ENABLED:
+            continue
+        try:
+            modules[name] = importlib.import_module(module_name)
+        except Exception as e:
+            print(f"❌ Gateway: {name} ({module_name}) not mounted: {e}")
+    if "rates" in ENABLED:
+        import rates_collector
+        rates_collector.restore_snapshot()
+        modules["rates"] = rates_collector
+
+
+def connect_cache():
+    """Feed the shared cache from every service's own update path"""
+    if "mcx" in modules:
+        modules["mcx"].broadcaster.add_listener(lambda data: cache.publish("mcx", data))
+    if "lme" in modules:
+        modules["lme"].broadcaster.add_listener(lambda data: cache.publish("lme_3m", data))
+    if "whatsapp" in modules:
+        whatsapp = modules["whatsapp"]
+        handler = whatsapp.ingest_queue.handler
+
+        def handle_and_publish(*args):
+            parsed = handler(*args)
+            if parsed:
+                cache.publish("whatsapp", dict(whatsapp.latest_prices))
+            return parsed
+
+        whatsapp.ingest_queue.handler = handle_and_publish
+    if "rates" in modules:
+        cache.sync()
+        for name, source in modules["rates"].SOURCES.items():
+            # Values restored from the collector's own snapshot, unless a newer one is cached
+            if source.data and not cache.get(name):
+                cache.publish(name, source.data, persist=False)
+
+
+def acquire_leadership():
+    """Non-blocking exclusive lock on LOCK_PATH; the handle must stay open while leading"""
+    handle = open(LOCK_PATH, "a")
+    if fcntl is None:
+        return handle
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+
+async def lead(state):
+    """Start the background scrapers in this worker"""
+    print(f"👑 Gateway worker {os.getpid()} runs the scrapers: {', '.join(SCRAPERS) or 'none'}")
+    if "mcx" in SCRAPERS and "mcx" in modules:
+        threading.Thread(target=modules["mcx"].background_scraper, name="mcx-scraper", daemon=True).start()
+    if "lme" in SCRAPERS and "lme" in modules:
+        threading.Thread(target=modules["lme"].continuous_scraping, name="lme-scraper", daemon=True).start()
+    if "rates" in SCRAPERS and "rates" in modules:
+        rates = modules["rates"]
+        state["http_session"] = rates.create_http_session()
+        state["tasks"] += [
+            asyncio.create_task(rates.run_source(source, state["http_session"],
+                                                 lambda s: cache.publish(s.name, s.data)))
+            for source in rates.SOURCES.values()
+        ]
+    if "whatsapp" in modules:
+        modules["whatsapp"].ingest_queue.recover()
+
+
+async def sync_loop(state):
+    """Pick up values from other workers and take over scraping if the leader exits"""
+    next_attempt = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        cache.sync()
+        if state["lock"] is None and loop.time() >= next_attempt:
+            state["lock"] = acquire_leadership()
+            if state["lock"] is not None:
+                await lead(state)
+            next_attempt = loop.time() + LEADER_RETRY
+        await asyncio.sleep(SYNC_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    state = {"lock": None, "tasks": [], "http_session": None}
+    app.state.gateway = state
+    cache.bind(asyncio.get_running_loop())
+    cache.sync()
+    state["tasks"].append(asyncio.create_task(sync_loop(state)))
+    try:
+        yield
+    finally:
+        for task in state["tasks"]:
+            task.cancel()
+        await asyncio.gather(*state["tasks"], return_exceptions=True)
+        if state["http_session"] is not None:
+            await state["http_session"].close()
+        if "rates" in modules:
+            modules["rates"].tick_store.flush()
+        if state["lock"] is not None:
+            state["lock"].close()
+
+
+def requested_sources(connection):
+    return {source for source in connection.query_params.get("source", "").split(",") if source}
+
+
+async def sse(request, sources, initial_frames, frame):
+    """Async SSE response: initial frames, then frame(source, entry) per update, heartbeat when idle"""
+    q = cache.subscribe(sources)
+
+    async def events():
+        try:
+            for initial in initial_frames:
+                yield initial
+            while True:
+                try:
+                    source, entry = await asyncio.wait_for(q.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield frame(source, entry)
+        finally:
+            cache.unsubscribe(q)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def latest(request):
+    source = request.path_params.get("source")
+    if source:
+        entry = cache.get(source)
+        if entry is None:
+            return JSONResponse({"error": f"No data for {source} yet"}, status_code=404)
+        return JSONResponse(entry)
+    return JSONResponse(dict(cache.items()))
+
+
+async def stream(request):
+    """Every source (or ?source=a,b) as named SSE events carrying the cache entry"""
+    sources = requested_sources(request)
+    frame = lambda source, entry: format_sse(entry, event=source, event_id=entry["seq"])  # noqa: E731
+    return await sse(request, sources, [frame(s, e) for s, e in cache.items(sources)], frame)
+
+
+def delta_stream(source):
+    """Drop-in async replacement for a DeltaBroadcaster /stream (MCX).
+
+    Same protocol as the service: the full snapshot as a ``message`` event on
+    connect, then ``delta`` events ``{"seq", "changes"}`` numbered by the
+    cache entry's seq. A client that missed an entry (coalesced while it was
+    slow) gets the full snapshot again instead of a delta.
+    """
+    last_delta = {}  # seq -> frame, shared: every client at seq - 1 gets the same delta
+
+    async def handler(request):
+        held = {"seq": None, "data": None}  # what this client has
+
+        def frame(_, entry):
+            seq, data = entry["seq"], entry["data"]
+            contiguous = held["seq"] is not None and seq == held["seq"] + 1
+            previous, held["seq"], held["data"] = held["data"], seq, data
+            if contiguous:
+                if seq not in last_delta:
+                    changes = diff_snapshot(previous, data)
+                    last_delta.clear()
+                    last_delta[seq] = None if changes is None else format_sse(
+                        {"seq": seq, "changes": changes}, event="delta", event_id=seq)
+                if last_delta[seq] is not None:
+                    return last_delta[seq]
+            return format_sse(data, event_id=seq)
+
+        entry = cache.get(source)
+        return await sse(request, {source}, [frame(source, entry)] if entry else [], frame)
+    return handler
+
+
+def source_stream(source):
+    """Drop-in async replacement for a Broadcaster /stream: plain message events with the data"""
+    async def handler(request):
+        def frame(_, entry):
+            return format_sse(entry["data"])
+        entry = cache.get(source)
+        return await sse(request, {source}, [frame(source, entry)] if entry else [], frame)
+    return handler
+
+
+async def websocket_feed(websocket):
+    """Push {"source", "data", "updated_at", "seq"} messages for ?source=a,b (default all)"""
+    sources = requested_sources(websocket)
+    await websocket.accept()
+    q = cache.subscribe(sources)
+
+    async def until_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    watcher = asyncio.create_task(until_disconnect())
+    try:
+        for source, entry in cache.items(sources):
+            await websocket.send_text(json.dumps({"source": source, **entry}))
+        while not watcher.done():
+            try:
+                source, entry = await asyncio.wait_for(q.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                continue
+            await websocket.send_text(json.dumps({"source": source, **entry}))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        watcher.cancel()
+        cache.unsubscribe(q)
+
+
+def cached_rates(source, message, fallback=None):
+    """RBI/SBI routes served from the collector's value, same JSON as the Flask services"""
+    async def handler(request):
+        entry = cache.get(source)
+        data = entry["data"] if entry else None
+        if not data and fallback is not None:
+            # Collector has nothing yet: let the service scrape on demand
+            data = await run_in_threadpool(fallback)
+        if not data:
+            return JSONResponse({"error": "Failed to scrape data or table not found"}, status_code=500)
+        return JSONResponse({"success": True, "data": data, "message": message})
+    return handler
+
+
+async def lme_data(request):
+    """LME /data from the cache; only a worker with nothing cached falls back to the service"""
+    entry = cache.get("lme_3m")
+    if entry and entry["data"].get("Value") is not None:
+        return JSONResponse({"success": True, "data": entry["data"]})
+    row = modules["lme"].last_known_row
+    if row:
+        return JSONResponse({"success": True, "data": row, "note": "Using latest available data from CSV"})
+    return JSONResponse({"success": False, "error": "No data available"})
+
+
+async def mcx_scrape(request):
+    entry = cache.get("mcx")
+    if entry:
+        return JSONResponse(entry["data"])
+    return JSONResponse(await run_in_threadpool(modules["mcx"].scrape_cache.get))
+
+
+async def lme_cash(request):
+    entry = cache.get("lme_cash")
+    if not entry or not entry["data"]:
+        return JSONResponse({"error": "Failed to scrape data or table not found"}, status_code=500)
+    return JSONResponse({"success": True, "data": [{"date": Date, "price": price} for Date, price in entry["data"]]})
+
+
+async def rates_state(request):
+    return JSONResponse({name: source.state() for name, source in modules["rates"].SOURCES.items()})
+
+
+async def rates_stats(request):
+    return JSONResponse({"sources": {name: source.stats() for name, source in modules["rates"].SOURCES.items()}})
+
+
+async def whatsapp_price_data(request):
+    """Latest WhatsApp quote of ?metal= (aluminium by default), whichever worker parsed it"""
+    metal = request.query_params.get("metal", "aluminium").lower()
+    entry = cache.get("whatsapp")
+    data = entry["data"].get(metal) if entry else None
+    if not data or data.get("spot_price") is None:
+        return JSONResponse({"error": "No price data available yet"}, status_code=404)
+    return JSONResponse(data)
+
+
+async def metrics(request):
+    """Prometheus text for every service in this worker (each worker keeps its own)"""
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
+async def health(request):
+    state = request.app.state.gateway
+    return JSONResponse({
+        "pid": os.getpid(),
+        "leader": state["lock"] is not None,
+        "services": sorted(modules),
+        "cache": cache.stats(),
+    })
+
+
+def create_app():
+    load_services()
+    connect_cache()
+    routes = [
+        Route("/latest", latest),
+        Route("/latest/{source}", latest),
+        Route("/stream", stream),
+        WebSocketRoute("/ws", websocket_feed),
+        Route("/healthz", health),
+        Route("/metrics", metrics),
+    ]
+    # While the collector runs it is the only writer of the rate CSVs and ticks:
+    # the mounted RBI/SBI services then never scrape on demand, they serve its values
+    collector = "rates" in modules and "rates" in SCRAPERS
+    if "rbi" in modules or "rates" in modules:
+        fallback = modules["rbi"].rbi_cache.get if "rbi" in modules and not collector else None
+        routes.append(Route("/rbi/scrape", cached_rates("rbi", "Data scraped and saved to CSV", fallback)))
+    if "sbi" in modules or "rates" in modules:
+        fallback = modules["sbi"].sbi_cache.get if "sbi" in modules and not collector else None
+        routes.append(Route("/sbi/scrape-sbi-tt", cached_rates("sbi_tt", "SBI TT Sell rate scraped successfully", fallback)))
+    if "rates" in modules:
+        routes += [
+            Route("/rates", rates_state),
+            Route("/rates/lme-cash", lme_cash),
+            Route("/rates/stats", rates_stats),
+        ]
+    if "mcx" in modules:
+        routes += [
+            Route("/mcx/scrape", mcx_scrape),
+            Route("/mcx/stream", delta_stream("mcx")),
+        ]
+    if "lme" in modules:
+        routes += [
+            Route("/lme/data", lme_data),
+            Route("/lme/stream", source_stream("lme_3m")),
+        ]
+    if "whatsapp" in modules:
+        routes.append(Route("/whatsapp/api/price-data", whatsapp_price_data))
+    # Everything else goes to the Flask apps as they are
+    routes += [Mount(f"/{name}", WSGIMiddleware(module.app)) for name, module in modules.items() if name != "rates"]
+
+    return Starlette(
+        routes=routes,
+        lifespan=lifespan,
+        middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    )
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("gateway:app", host="0.0.0.0", port=PORT, workers=WORKERS)
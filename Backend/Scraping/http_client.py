@@ -0,0 +1,93 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import RETRIES, UPSTREAM_RESPONSES, stage
+from snapshot import save_snapshot, load_snapshot
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode Content-Encoding: br)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
+
+
+class HttpClient:
+    """Keep-alive session with timeouts, retries and conditional GETs.
+
+    The ETag / Last-Modified of every 200 response is remembered per URL and
+    sent back as If-None-Match / If-Modified-Since next time, so an unchanged
+    page comes back as an empty 304 that callers can skip parsing for.
+    Pass ``validators_path`` to keep them across runs (for one-shot scripts).
+    """
+
+    def __init__(self, timeout=(5, 20), retries=3, backoff=0.5, pool_maxsize=10, validators_path=None, name="http"):
+        self.timeout = timeout
+        self.name = name
+        self.validators_path = validators_path
+        self._validators = (load_snapshot(validators_path) or {}) if validators_path else {}
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Encoding": ACCEPT_ENCODING,
+        })
+
+    def get(self, url, conditional=True, **kwargs):
+        """GET url; status 304 means nothing changed since the last 200"""
+        headers = dict(kwargs.pop("headers", None) or {})
+        if conditional:
+            with self._lock:
+                validators = self._validators.get(url, {})
+            if validators.get("etag"):
+                headers["If-None-Match"] = validators["etag"]
+            if validators.get("last_modified"):
+                headers["If-Modified-Since"] = validators["last_modified"]
+
+        try:
+            with stage(self.name, "page_load"):
+                response = self.session.get(url, headers=headers, timeout=kwargs.pop("timeout", self.timeout), **kwargs)
+        except requests.RequestException:
+            UPSTREAM_RESPONSES.inc(service=self.name, status="error")
+            raise
+        UPSTREAM_RESPONSES.inc(service=self.name, status=response.status_code)
+        # urllib3 keeps the attempts it retried on the final response
+        retried = getattr(getattr(response.raw, "retries", None), "history", None)
+        if retried:
+            RETRIES.inc(len(retried), service=self.name)
+
+        if response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                self._remember(url, {"etag": etag, "last_modified": last_modified})
+        return response
+
+    def forget(self, url):
+        """Drop the validators for url so the next get() downloads the full page"""
+        self._remember(url, None)
+
+    def _remember(self, url, validators):
+        with self._lock:
+            if validators is None:
+                self._validators.pop(url, None)
+            else:
+                self._validators[url] = validators
+            snapshot = dict(self._validators)
+        if self.validators_path:
+            save_snapshot(self.validators_path, snapshot)
@@ -0,0 +1,76 @@
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import etree, html
+
+from metrics import SELECTOR_MISSES, UPSTREAM_RESPONSES, stage
+
+# data-test hooks investing.com renders server-side for an instrument quote
+XPATH_PRICE = "//div[@data-test='instrument-price-last']"
+XPATH_CHANGE_VALUE = "//span[@data-test='instrument-price-change']"
+XPATH_CHANGE_PERCENT = "//span[@data-test='instrument-price-change-percent']"
+XPATH_TIME = "//time[@data-test='trading-time-label']"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+QUOTE_FIELDS = {
+    "value": XPATH_PRICE,
+    "change_value": XPATH_CHANGE_VALUE,
+    "change_percent": XPATH_CHANGE_PERCENT,
+    "time_span": XPATH_TIME,
+}
+
+# Compile once: each evaluates to the whitespace-normalised text of the first match
+_compiled_fields = {
+    name: etree.XPath(f"normalize-space(string(({xpath})[1]))")
+    for name, xpath in QUOTE_FIELDS.items()
+}
+
+
+def extract_quote(page_html, service="investing"):
+    """Parse the quote fields out of raw HTML; None if any field is missing"""
+    if not page_html:
+        return None
+    try:
+        tree = html.fromstring(page_html)
+    except (etree.ParserError, ValueError):
+        return None
+
+    quote = {}
+    for name, xpath in _compiled_fields.items():
+        text = xpath(tree)
+        if not text:
+            SELECTOR_MISSES.inc(service=service, field=name)
+            return None
+        quote[name] = text
+    return quote
+
+
+def create_session(pool_maxsize=4):
+    """Keep-alive session so each tick reuses the same TLS connection"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "en-US,en;q=0.9",
+    })
+    return session
+
+
+def fetch_quote(session, url, timeout=10, service="investing"):
+    """Fetch url over plain HTTP and extract the quote, or None to fall back"""
+    try:
+        with stage(service, "page_load"):
+            response = session.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        UPSTREAM_RESPONSES.inc(service=service, status="error")
+        print(f"⚠️ HTTP fetch failed: {e}")
+        return None
+    UPSTREAM_RESPONSES.inc(service=service, status=response.status_code)
+    if response.status_code != 200:
+        print(f"⚠️ HTTP fetch returned status {response.status_code}")
+        return None
+    with stage(service, "extraction"):
+        return extract_quote(response.content, service)
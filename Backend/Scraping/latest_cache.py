@@ -0,0 +1,143 @@
+"""Latest value of every source, shared by all gateway workers.
+
+publish() can be called from any thread (the Selenium scraper loops run in
+threads, the rate collectors on the event loop). The value is kept in
+memory, handed to every async subscriber (SSE and WebSocket clients) and
+mirrored to one JSON file per source. Other worker processes pick those
+files up in sync(), which only stats them unless one changed, so every
+worker serves the same values no matter which one scraped them.
+"""
+import asyncio
+import os
+import threading
+import time
+
+from metrics import SSE_FANOUT_SECONDS
+from snapshot import load_snapshot, save_snapshot
+
+
+class LatestCache:
+    def __init__(self, directory=os.path.join("scraped_csv", "latest"), max_queue=8):
+        self.directory = directory
+        self.max_queue = max_queue
+        os.makedirs(directory, exist_ok=True)
+        self._entries = {}
+        self._mtimes = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self.published = 0
+        self.synced = 0
+        self.coalesced = 0
+
+    def bind(self, loop):
+        """Event loop the subscribers live on; call once at startup"""
+        self._loop = loop
+
+    def _path(self, source):
+        return os.path.join(self.directory, f"{source}.json")
+
+    def publish(self, source, data, persist=True):
+        """Store a new value for source and push it to subscribers"""
+        with self._lock:
+            previous = self._entries.get(source)
+            entry = {
+                "data": data,
+                "updated_at": time.time(),
+                "seq": (previous["seq"] if previous else 0) + 1,
+            }
+            self._entries[source] = entry
+            self.published += 1
+            if persist:
+                path = self._path(source)
+                save_snapshot(path, entry)
+                self._mtimes[source] = os.stat(path).st_mtime_ns
+        self._dispatch(source, entry)
+        return entry
+
+    def _dispatch(self, source, entry):
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fan_out(source, entry)
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, source, entry)
+
+    def _fan_out(self, source, entry):
+        started = time.perf_counter()
+        for q, sources in list(self._subscribers.items()):
+            if sources and source not in sources:
+                continue
+            while True:
+                try:
+                    q.put_nowait((source, entry))
+                    break
+                except asyncio.QueueFull:
+                    # Slow client: drop its oldest update, the newest one matters more
+                    q.get_nowait()
+                    self.coalesced += 1
+        SSE_FANOUT_SECONDS.observe(time.perf_counter() - started, stream="gateway")
+
+    def sync(self):
+        """Load values other workers wrote since the last call; returns how many changed"""
+        changed = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            source = name[:-5]
+            try:
+                mtime = os.stat(self._path(source)).st_mtime_ns
+            except OSError:
+                continue
+            if self._mtimes.get(source) == mtime:
+                continue
+            entry = load_snapshot(self._path(source))
+            if not entry or "data" not in entry:
+                continue
+            with self._lock:
+                self._mtimes[source] = mtime
+                current = self._entries.get(source)
+                if current and current["updated_at"] >= entry.get("updated_at", 0):
+                    continue
+                self._entries[source] = entry
+                self.synced += 1
+            changed += 1
+            self._dispatch(source, entry)
+        return changed
+
+    def get(self, source):
+        with self._lock:
+            return self._entries.get(source)
+
+    def items(self, sources=None):
+        with self._lock:
+            return [(source, entry) for source, entry in self._entries.items()
+                    if not sources or source in sources]
+
+    def subscribe(self, sources=None):
+        """asyncio.Queue of (source, entry) updates, optionally limited to some sources"""
+        q = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers[q] = set(sources or ())
+        return q
+
+    def unsubscribe(self, q):
+        self._subscribers.pop(q, None)
+
+    def stats(self):
+        with self._lock:
+            ages = {source: round(time.time() - entry["updated_at"], 1) for source, entry in self._entries.items()}
+        return {
+            "sources": ages,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "synced": self.synced,
+            "coalesced": self.coalesced,
+        }
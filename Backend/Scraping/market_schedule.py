@@ -0,0 +1,138 @@
+import json
+import os
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+CALENDAR_PATH = os.getenv(
+    "MARKET_CALENDAR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_calendar.json")
+)
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def load_calendar(path=CALENDAR_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class MarketHours:
+    """Trading sessions and holidays for one exchange, read from the calendar file"""
+
+    def __init__(self, market, calendar=None):
+        calendar = calendar or load_calendar()
+        config = calendar[market]
+        self.market = market
+        self.tz = ZoneInfo(config["timezone"])
+        self.holidays = set(config.get("holidays", []))
+        self.sessions = {
+            day: [(self._parse_clock(start), self._parse_clock(end)) for start, end in ranges]
+            for day, ranges in config.get("sessions", {}).items()
+        }
+
+    @staticmethod
+    def _parse_clock(text):
+        hours, minutes = text.split(":")
+        return timedelta(hours=int(hours), minutes=int(minutes))
+
+    def _sessions_on(self, day):
+        """(start, end) datetimes of every session on the given local date"""
+        if day.strftime("%Y-%m-%d") in self.holidays:
+            return []
+        midnight = datetime(day.year, day.month, day.day, tzinfo=self.tz)
+        return [(midnight + start, midnight + end)
+                for start, end in self.sessions.get(WEEKDAYS[day.weekday()], [])]
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def is_open(self, at=None):
+        at = (at or self.now()).astimezone(self.tz)
+        return any(start <= at < end for start, end in self._sessions_on(at.date()))
+
+    def current_session(self, at=None):
+        """(start, end) of the session open at ``at``, or None when closed"""
+        at = (at or self.now()).astimezone(self.tz)
+        for start, end in self._sessions_on(at.date()):
+            if start <= at < end:
+                return start, end
+        return None
+
+    def last_session_start(self, at=None, horizon_days=14):
+        """Start of the most recent session that has already begun, or None"""
+        at = (at or self.now()).astimezone(self.tz)
+        for offset in range(horizon_days):
+            starts = [start for start, _ in self._sessions_on(at.date() - timedelta(days=offset))
+                      if start <= at]
+            if starts:
+                return max(starts)
+        return None
+
+    def seconds_until_open(self, at=None, horizon_days=14):
+        """Seconds until the next session starts (0 while a session is open)"""
+        at = (at or self.now()).astimezone(self.tz)
+        for offset in range(horizon_days):
+            for start, end in self._sessions_on(at.date() + timedelta(days=offset)):
+                if start <= at < end:
+                    return 0
+                if start > at:
+                    return (start - at).total_seconds()
+        return None
+
+
+class AdaptiveScheduler:
+    """Pick the delay before the next scrape.
+
+    In session the interval shrinks towards ``min_interval`` while the scraped
+    value keeps changing and grows towards ``max_interval`` while it does not.
+    Out of session it drops to a slow ``off_hours_interval`` heartbeat, cut
+    short so the first in-session scrape happens right at the open.
+    """
+
+    def __init__(self, market, min_interval, max_interval, off_hours_interval=900,
+                 speed_up=0.5, slow_down=1.5, calendar=None):
+        self.hours = MarketHours(market, calendar)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.off_hours_interval = off_hours_interval
+        self.speed_up = speed_up
+        self.slow_down = slow_down
+        self.interval = min_interval
+        self._last_value = None
+        self.unchanged_streak = 0
+
+    def observe(self, value):
+        """Record the latest scraped value; returns True if it changed"""
+        changed = value is not None and value != self._last_value
+        if changed:
+            self._last_value = value
+            self.unchanged_streak = 0
+            self.interval = max(self.min_interval, self.interval * self.speed_up)
+        else:
+            self.unchanged_streak += 1
+            self.interval = min(self.max_interval, self.interval * self.slow_down)
+        return changed
+
+    def next_delay(self):
+        """Seconds to wait before the next scrape"""
+        if not self.hours.is_open():
+            # Restart adaptation from the fastest rate at the next open
+            self.interval = self.min_interval
+        return self._delay()
+
+    def _delay(self):
+        if self.hours.is_open():
+            return self.interval
+        until_open = self.hours.seconds_until_open()
+        if until_open is None:
+            return self.off_hours_interval
+        return max(self.min_interval, min(self.off_hours_interval, until_open))
+
+    def state(self):
+        return {
+            "market": self.hours.market,
+            "open": self.hours.is_open(),
+            "interval": round(self.interval, 2),
+            "unchanged_streak": self.unchanged_streak,
+            "next_delay": round(self._delay(), 2),
+        }
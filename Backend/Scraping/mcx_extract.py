@@ -0,0 +1,119 @@
+import re
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from lxml import etree, html
+
+# Precompiled once instead of re-importing/re-compiling inside the selector loops
+RUPEE_PRICE_RE = re.compile(r"₹\s*([\d,.]+)")
+CHANGE_VALUE_RE = re.compile(r"([+-]?\d+(\.\d+)?)")
+CHANGE_PERCENT_RE = re.compile(r"\(([-+]?\d+(\.\d+)?)%\)")
+
+DATE_FORMATS = [
+    "%d %B, %Y | %H:%M",
+    "%d %B %Y | %H:%M",
+    "%d %B, %Y %H:%M",
+    "%d %b, %Y | %H:%M",
+    "%B %d, %Y | %H:%M"
+]
+
+_rupee_nodes = etree.XPath("//*[contains(text(), '₹')]")
+
+
+@lru_cache(maxsize=256)
+def compile_text_xpath(selector):
+    """Compiled XPath returning the normalised text of the first match"""
+    return etree.XPath(f"normalize-space(string(({selector})[1]))")
+
+
+class PageSnapshot:
+    """One parsed copy of page_source; every field is read from it in-process"""
+
+    def __init__(self, page_html):
+        self.tree = html.fromstring(page_html)
+
+    def text(self, selector):
+        return compile_text_xpath(selector)(self.tree)
+
+    def rupee_texts(self):
+        return [" ".join(node.text_content().split()) for node in _rupee_nodes(self.tree)]
+
+
+def parse_price(text):
+    """'₹ 232.25' / '232.25' -> 232.25; None when it is not a number"""
+    if "₹" in text:
+        match = RUPEE_PRICE_RE.search(text)
+        if match:
+            text = match.group(1)
+    text = text.replace("₹", "").replace(",", "").strip()
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def price_from_rate_change(rate_change):
+    """Back out the price from '-5 (-2.1%)': change is percent% of the price"""
+    if "(" not in rate_change or ")" not in rate_change:
+        return None
+    change_match = CHANGE_VALUE_RE.search(rate_change)
+    percent_match = CHANGE_PERCENT_RE.search(rate_change)
+    if not change_match or not percent_match:
+        return None
+    percent = float(percent_match.group(1))
+    if percent == 0:
+        return None
+    return abs(float(change_match.group(1)) / (percent / 100))
+
+
+def parse_market_timestamp(text):
+    """'As on 05 April, 2025 | 10:07' -> datetime, or None"""
+    text = text.replace("As on", "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def first_match(snapshot, field, selectors, selector_cache, accept=bool):
+    """Try selectors in learned order against the snapshot; return (selector, text, parsed)"""
+    for key, selector in selector_cache.ranked(field, selectors):
+        started = time.perf_counter()
+        text = snapshot.text(selector)
+        parsed = accept(text) if text else None
+        hit = parsed is not None and parsed is not False
+        selector_cache.record(field, key, hit, time.perf_counter() - started)
+        if hit:
+            return selector, text, parsed
+    return None, None, None
+
+
+def extract_contract(snapshot, price_selectors, rate_selectors, selector_cache):
+    """Price and rate change for the contract currently shown in the snapshot"""
+    _, _, price = first_match(snapshot, "price", price_selectors, selector_cache, parse_price)
+
+    if price is None:
+        # Fallback: any node showing a rupee amount
+        for text in snapshot.rupee_texts():
+            match = RUPEE_PRICE_RE.search(text)
+            if match:
+                try:
+                    price = float(match.group(1).replace(",", ""))
+                    break
+                except ValueError:
+                    continue
+
+    _, rate_change, _ = first_match(snapshot, "rate", rate_selectors, selector_cache)
+    rate_change = rate_change or "N/A"
+
+    if price is None and rate_change != "N/A":
+        # Last resort - derive it from the rate change
+        price = price_from_rate_change(rate_change)
+
+    return {
+        "price": price if price is not None else "N/A",
+        "site_rate_change": rate_change
+    }
@@ -0,0 +1,214 @@
+"""In-process metrics rendered in the Prometheus text format on /metrics.
+
+Counters, gauges and histograms are plain dicts keyed by label values,
+updated under a per-metric lock, so an observation costs about a
+microsecond and they can stay on in production. Everything in one process
+shares REGISTRY (under the gateway that is every service of a worker).
+
+The scrapers report:
+    scrape_stage_seconds{service,stage}    driver_start, page_load, extraction, persistence, total
+    selector_wait_seconds{service,field}   every selector tried, hit or miss
+    selector_misses_total{service,field}
+    scrape_retries_total{service}
+    upstream_responses_total{service,status}
+    sse_fanout_seconds{stream}             handing one update to every subscriber
+    data_age_seconds{source,instrument}    time since the last stored tick
+"""
+import bisect
+import threading
+import time
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self):
+        """(suffix, labels, value) for every series"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", self._labels(key), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Age(Gauge):
+    """Gauge of the seconds since mark() was last called for each label set"""
+
+    def mark(self, **labels):
+        self.set(time.time(), **labels)
+
+    def samples(self):
+        now = time.time()
+        for suffix, labels, marked in super().samples():
+            yield suffix, labels, round(now - marked, 3)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                yield "_bucket", self._labels(key, [("le", _format_value(float(bound)))]), cumulative
+            yield "_sum", self._labels(key), total
+            yield "_count", self._labels(key), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def age(self, name, documentation, labelnames=()):
+        return self._get_or_create(Age, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "scrape_stage_seconds", "Time spent in each stage of a scrape", ["service", "stage"])
+SELECTOR_WAIT_SECONDS = REGISTRY.histogram(
+    "selector_wait_seconds", "Time spent on each selector tried, hit or miss", ["service", "field"])
+SELECTOR_MISSES = REGISTRY.counter(
+    "selector_misses_total", "Selectors that matched nothing", ["service", "field"])
+RETRIES = REGISTRY.counter(
+    "scrape_retries_total", "Fetches or scrapes retried after a failure", ["service"])
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    "upstream_responses_total", "Responses from upstream sites by HTTP status (error: no response)",
+    ["service", "status"])
+SSE_FANOUT_SECONDS = REGISTRY.histogram(
+    "sse_fanout_seconds", "Time to hand one update to every stream subscriber", ["stream"], buckets=FAST_BUCKETS)
+DATA_AGE = REGISTRY.age(
+    "data_age_seconds", "Seconds since the last tick was stored", ["source", "instrument"])
+
+
+def stage(service, name):
+    """``with stage("mcx", "page_load"):`` times a block into scrape_stage_seconds"""
+    return STAGE_SECONDS.time(service=service, stage=name)
+
+
+def render():
+    return REGISTRY.render()
+
+
+def metrics_response():
+    """Flask response for a /metrics route"""
+    from flask import Response
+
+    return Response(render(), content_type=CONTENT_TYPE)
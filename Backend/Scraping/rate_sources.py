@@ -0,0 +1,61 @@
+import os
+
+from table_parser import first_table, parse_tables
+
+# Upstream pages for the daily reference rates (overridable, e.g. to point at
+# the local stand-in sites of benchmarks/bench_offline.py)
+RBI_URL = os.getenv("RBI_URL", "https://www.msei.in/markets/currency/historical-data/rbireferenceratearchives")
+SBI_TT_URL = os.getenv("SBI_TT_URL", "https://officialforexrates.com/")
+LME_CASH_URL = os.getenv("LME_CASH_URL", "https://www.westmetall.com/en/markdaten.php?action=table&field=LME_Al_cash")
+
+
+def parse_rbi_rates(page_html, backend=None):
+    """Latest RBI reference rates as [{"date", "rate"}]; None if the table is missing"""
+    table = first_table(page_html, backend)
+    if not table:
+        return None
+
+    data = []
+    for columns in table.rows[:3]:  # Extract first 3 rows
+        if len(columns) > 2:
+            data.append({"date": columns[0], "rate": columns[1]})
+    return data
+
+
+def parse_sbi_tt_sell(page_html, backend=None):
+    """Today's SBI TT sell rate as [{"date", "sbi_tt_sell"}]; None if the table is missing"""
+    table = first_table(page_html, backend)
+    if not table:
+        return None
+
+    date_cells = table.head[0] if table.head else []
+    Date = date_cells[1] if len(date_cells) > 1 else "N/A"
+
+    data = []
+    for columns in table.body[:1]:  # Get first row
+        sbi_tt_sell = columns[1] if len(columns) > 1 else "N/A"
+        data.append({"date": Date, "sbi_tt_sell": sbi_tt_sell})
+    return data
+
+
+def parse_lme_cash(page_html, backend=None):
+    """Latest LME aluminium cash settlement as [[Date, price]]; None if the table is missing"""
+    table = first_table(page_html, backend)
+    if not table:
+        return None
+
+    data = []
+    for columns in table.body[:1]:
+        if len(columns) > 1:
+            data.append([columns[0], columns[1]])
+    return data
+
+
+def parse_lme_cash_history(page_html, backend=None):
+    """Every row of the westmetall archive (one table per year) as [[Date, price]]"""
+    return [
+        [columns[0], columns[1]]
+        for table in parse_tables(page_html, backend=backend)
+        for columns in table.body
+        if len(columns) > 1
+    ]
@@ -0,0 +1,334 @@
+"""One asyncio process that collects every daily reference rate.
+
+RBI reference rates, SBI TT sell and LME aluminium cash settlement are each
+published about once per business day. Instead of scraping on every API call
+(rbi_scrap.py, sbitt_scrap.py) or by hand (LME_CSP_scrap.py), this collector
+polls each source on its own cadence from one event loop:
+
+* inside the source's publication window (``market_calendar.json``) it polls
+  every ``poll_interval`` seconds until a new value shows up
+* after that, and outside the window, it sleeps until the next window opens
+
+Failed fetches are retried with exponential backoff and full jitter. New
+values go to the tick store (and the CSVs the /download routes serve) and the
+latest value of every source is served from memory over HTTP, using the same
+routes and JSON shapes as the Flask services.
+
+Run with:
+    python rates_collector.py
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout, TCPConnector, web
+
+from csv_store import KeyedCsv
+from http_client import ACCEPT_ENCODING, USER_AGENT
+from market_schedule import MarketHours
+from metrics import CONTENT_TYPE, RETRIES, STAGE_SECONDS, UPSTREAM_RESPONSES, render, stage
+from rate_sources import (
+    LME_CASH_URL, RBI_URL, SBI_TT_URL,
+    parse_lme_cash, parse_rbi_rates, parse_sbi_tt_sell,
+)
+from snapshot import load_snapshot, save_snapshot
+from timeseries_store import TickStore, publication_date
+
+PORT = int(os.getenv("RATES_COLLECTOR_PORT", "5004"))
+SNAPSHOT_PATH = "scraped_csv/rates_latest.json"
+CSV_FILE_PATH_SBI = "scraped_csv/sbitt.csv"
+CSV_FILE_PATH_LME_CASH = "scraped_csv/LME_CSP_Scarp.csv"
+
+RETRY_ATTEMPTS = 4
+RETRY_BASE_DELAY = 2.0
+RETRY_MAX_DELAY = 60.0
+
+tick_store = TickStore()
+sbi_csv = KeyedCsv(CSV_FILE_PATH_SBI, ["date", "sbi_tt_sell"], key=["date"])
+lme_cash_csv = KeyedCsv(CSV_FILE_PATH_LME_CASH, ["Date", "LME_Aluminium_Cash"], key=["Date"])
+
+
+def store_rbi(data):
+    for row in data:
+        tick_store.append("rbi_ref", "USDINR", row["date"], row["rate"])
+    tick_store.flush()
+
+
+def store_sbi_tt(data):
+    sbi_csv.upsert(data)
+    for row in data:
+        tick_store.append("sbi_tt", "USDINR", row["date"], row["sbi_tt_sell"])
+    tick_store.flush()
+
+
+def store_lme_cash(data):
+    lme_cash_csv.upsert(data)
+    for Date, LME_Aluminium_Cash in data:
+        tick_store.append("lme_cash", "aluminium", Date, LME_Aluminium_Cash)
+    tick_store.flush()
+
+
+class RateSource:
+    """One upstream page: how to fetch, parse and store it, and when to poll it"""
+
+    def __init__(self, name, url, parse, store, window, published, poll_interval=300):
+        self.name = name
+        self.url = url
+        self.parse = parse
+        self.store = store
+        self.published = published
+        self.hours = MarketHours(window)
+        self.poll_interval = poll_interval
+        self.data = None
+        self.fetched_at = None
+        self.changed_at = None
+        self.validators = {}
+        self.fetches = 0
+        self.not_modified = 0
+        self.retries = 0
+        self.failures = 0
+
+    def conditional_headers(self):
+        headers = {}
+        if self.validators.get("etag"):
+            headers["If-None-Match"] = self.validators["etag"]
+        if self.validators.get("last_modified"):
+            headers["If-Modified-Since"] = self.validators["last_modified"]
+        return headers
+
+    async def fetch(self, session):
+        """(page HTML, its validators), or (None, None) when unchanged (304).
+
+        Connection errors, timeouts, 5xx and 429 are retried with full jitter;
+        any other 4xx is raised straight away.
+        """
+        for attempt in range(1, RETRY_ATTEMPTS + 1):
+            started = time.perf_counter()
+            try:
+                async with session.get(self.url, headers=self.conditional_headers()) as response:
+                    self.fetches += 1
+                    UPSTREAM_RESPONSES.inc(service=self.name, status=response.status)
+                    if response.status == 304:
+                        self.not_modified += 1
+                        return None, None
+                    response.raise_for_status()
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+                    page_html = await response.text()
+                    STAGE_SECONDS.observe(time.perf_counter() - started, service=self.name, stage="page_load")
+                    return page_html, validators
+            except (ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, ClientResponseError) and e.status < 500 and e.status != 429:
+                    raise  # same request, same answer: not worth retrying
+                if not isinstance(e, ClientResponseError):
+                    UPSTREAM_RESPONSES.inc(service=self.name, status="error")
+                if attempt == RETRY_ATTEMPTS:
+                    raise
+                self.retries += 1
+                RETRIES.inc(service=self.name)
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                print(f"⚠️ {self.name}: {e}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def collect(self, session):
+        """Fetch once; store and return True when the value changed"""
+        page_html, validators = await self.fetch(session)
+        self.fetched_at = time.time()
+        if page_html is None:
+            return False
+        # bs4 parsing and the SQLite write are blocking, keep them off the loop
+        data = await asyncio.to_thread(self.timed, "extraction", self.parse, page_html)
+        if not data:
+            # Keep validators only for pages that parsed, or every later poll is a 304
+            self.validators = {}
+            return False
+        self.validators = validators
+        if data == self.data:
+            return False
+        previous, self.data = self.data, data
+        await asyncio.to_thread(self.timed, "persistence", self.store, data)
+        if previous is not None:
+            self.changed_at = self.fetched_at
+        else:
+            self.seed_changed_at()
+        return True
+
+    def seed_changed_at(self):
+        """No change seen since startup: count a value that already carries
+        the current window's publication date as this window's change"""
+        if self.changed_at is not None or not self.data:
+            return
+        start = self.hours.last_session_start()
+        published = self.published(self.data)
+        if start and published and published >= start.strftime("%Y-%m-%d"):
+            self.changed_at = time.time()
+
+    def timed(self, name, func, *args):
+        with stage(self.name, name):
+            return func(*args)
+
+    def next_delay(self):
+        """Poll inside the publication window until today's value has arrived"""
+        if self.data is None:
+            # Nothing to serve yet: keep trying regardless of the window
+            return self.poll_interval
+        now = self.hours.now()
+        session = self.hours.current_session(now)
+        if session and not (self.changed_at and self.changed_at >= session[0].timestamp()):
+            return self.poll_interval
+        after = session[1] if session else now
+        until_open = self.hours.seconds_until_open(after)
+        if until_open is None:
+            return self.poll_interval
+        return (after - now).total_seconds() + until_open
+
+    def state(self):
+        return {
+            "data": self.data,
+            "fetched_at": self.fetched_at,
+            "changed_at": self.changed_at,
+        }
+
+    def stats(self):
+        return {
+            "window_open": self.hours.is_open(),
+            "fetches": self.fetches,
+            "not_modified": self.not_modified,
+            "retries": self.retries,
+            "failures": self.failures,
+            "next_delay": round(self.next_delay(), 1),
+        }
+
+
+def published_rows(data):
+    return publication_date(row["date"] for row in data)
+
+
+def published_lme_cash(data):
+    return publication_date(Date for Date, _ in data)
+
+
+SOURCES = {
+    "rbi": RateSource("rbi", RBI_URL, parse_rbi_rates, store_rbi, "RBI_REF", published_rows),
+    "sbi_tt": RateSource("sbi_tt", SBI_TT_URL, parse_sbi_tt_sell, store_sbi_tt, "SBI_TT", published_rows),
+    "lme_cash": RateSource("lme_cash", LME_CASH_URL, parse_lme_cash, store_lme_cash, "LME_CASH",
+                           published_lme_cash, poll_interval=600),
+}
+
+
+def restore_snapshot():
+    """Serve the last collected values immediately after a restart"""
+    saved = load_snapshot(SNAPSHOT_PATH) or {}
+    for name, source in SOURCES.items():
+        state = saved.get(name) or {}
+        source.data = state.get("data")
+        source.fetched_at = state.get("fetched_at")
+        source.changed_at = state.get("changed_at")
+        source.seed_changed_at()
+
+
+async def run_source(source, session, on_update=None):
+    while True:
+        try:
+            if await source.collect(session):
+                print(f"✅ {source.name} updated: {source.data}")
+                save_snapshot(SNAPSHOT_PATH, {name: s.state() for name, s in SOURCES.items()})
+                if on_update:
+                    on_update(source)
+        except Exception as e:
+            source.failures += 1
+            print(f"❌ {source.name} collection failed: {e}")
+        delay = source.next_delay()
+        print(f"⏱️ {source.name}: next fetch in {delay:.0f}s")
+        await asyncio.sleep(delay)
+
+
+def create_http_session():
+    return ClientSession(
+        timeout=ClientTimeout(total=30, connect=5),
+        connector=TCPConnector(limit_per_host=2),
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+    )
+
+
+async def start_collectors(app):
+    session = create_http_session()
+    app["http_session"] = session
+    app["collectors"] = [asyncio.create_task(run_source(source, session)) for source in SOURCES.values()]
+
+
+async def stop_collectors(app):
+    for task in app["collectors"]:
+        task.cancel()
+    await asyncio.gather(*app["collectors"], return_exceptions=True)
+    await app["http_session"].close()
+    tick_store.flush()
+
+
+def not_ready():
+    return web.json_response({"error": "Failed to scrape data or table not found"}, status=500)
+
+
+async def get_rbi_rates(request):
+    data = SOURCES["rbi"].data
+    if not data:
+        return not_ready()
+    return web.json_response({"success": True, "data": data, "message": "Data scraped and saved to CSV"})
+
+
+async def get_sbi_tt_sell(request):
+    data = SOURCES["sbi_tt"].data
+    if not data:
+        return not_ready()
+    return web.json_response({"success": True, "data": data, "message": "SBI TT Sell rate scraped successfully"})
+
+
+async def get_lme_cash(request):
+    data = SOURCES["lme_cash"].data
+    if not data:
+        return not_ready()
+    return web.json_response({"success": True, "data": [{"date": Date, "price": price} for Date, price in data]})
+
+
+async def get_rates(request):
+    return web.json_response({name: source.state() for name, source in SOURCES.items()})
+
+
+async def get_stats(request):
+    return web.json_response({
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "sources": {name: source.stats() for name, source in SOURCES.items()},
+    })
+
+
+async def get_metrics(request):
+    return web.Response(text=render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+@web.middleware
+async def cors(request, handler):
+    response = await handler(request)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def create_app():
+    restore_snapshot()
+    app = web.Application(middlewares=[cors])
+    app.router.add_get("/scrape", get_rbi_rates)
+    app.router.add_get("/scrape-sbi-tt", get_sbi_tt_sell)
+    app.router.add_get("/lme-cash", get_lme_cash)
+    app.router.add_get("/rates", get_rates)
+    app.router.add_get("/stats", get_stats)
+    app.router.add_get("/metrics", get_metrics)
+    app.on_startup.append(start_collectors)
+    app.on_cleanup.append(stop_collectors)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0", port=PORT)
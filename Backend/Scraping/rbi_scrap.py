@@ -1,39 +1,43 @@
 
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import os
+from timeseries_store import TickStore, publication_date
+from scrape_cache import PublicationCache
+from http_client import HttpClient
+from rate_sources import RBI_URL, parse_rbi_rates
+from metrics import metrics_response, stage
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
 
 CSV_FILE_PATH = "scraped_csv/rbi_reference_rates.csv"
+tick_store = TickStore()
+http_client = HttpClient(name="rbi")
+last_rbi_rates = None  # last parsed result, reused when the page is unchanged (304)
 
 # Function to scrape data
 def scrape_rbi_rates():
-    url = "https://www.msei.in/markets/currency/historical-data/rbireferenceratearchives"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
-    }
+    global last_rbi_rates
+    url = RBI_URL
+    response = http_client.get(url)
 
-    response = requests.get(url, headers=headers)
+    if response.status_code == 304:
+        if last_rbi_rates:
+            return last_rbi_rates
+        # Unchanged, but the last full page did not parse: fetch it again in full
+        response = http_client.get(url, conditional=False)
 
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table")
-
-        data = []
-        if table:
-            rows = table.find_all("tr")
-            for row in rows[:3]:  # Extract first 3 rows
-                columns = row.find_all("td")
-                if len(columns) > 2:
-                    date = columns[0].text.strip()
-                    rate = columns[1].text.strip()
-                    data.append({"date": date, "rate": rate})
+        with stage("rbi", "extraction"):
+            data = parse_rbi_rates(response.text)
+
+        if data is not None:
+            with stage("rbi", "persistence"):
+                for row in data:
+                    tick_store.append("rbi_ref", "USDINR", row["date"], row["rate"])
 
             # # Convert to DataFrame
             # df = pd.DataFrame(data)
@@ -47,20 +51,41 @@ def scrape_rbi_rates():
             # # Append data to CSV
             # df.to_csv(CSV_FILE_PATH, mode="a", index=False, header=write_header)
 
+            last_rbi_rates = data
             return data
         else:
             return None
     return None
 
 # API route to fetch & store data
+# The rate changes once per business day: serve it from memory until the next
+# publication window (RBI_REF in market_calendar.json) and only poll upstream there
+rbi_cache = PublicationCache(
+    scrape_rbi_rates, window="RBI_REF", name="rbi",
+    published=lambda data: publication_date(row["date"] for row in data),
+)
+
 @app.route('/scrape', methods=['GET'])
 def get_rbi_rates():
-    data = scrape_rbi_rates()
+    data = rbi_cache.get()
     if data:
         return jsonify({"success": True, "data": data, "message": "Data scraped and saved to CSV"})
     else:
         return jsonify({"error": "Failed to scrape data or table not found"}), 500
 
+@app.route('/history', methods=['GET'])
+def get_rbi_history():
+    return jsonify(tick_store.history_from_args("rbi_ref", request.args))
+
+@app.route('/stats', methods=['GET'])
+def get_rbi_stats():
+    return jsonify({"cache": rbi_cache.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text: stage latencies, upstream status codes, data age"""
+    return metrics_response()
+
 # Run the Flask app
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,69 +1,83 @@
 
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-import os
+from timeseries_store import TickStore, publication_date
+from scrape_cache import PublicationCache
+from http_client import HttpClient
+from csv_store import KeyedCsv
+from rate_sources import SBI_TT_URL, parse_sbi_tt_sell
+from metrics import metrics_response, stage
 
 app = Flask(__name__)
 CORS(app)
 
 CSV_FILE_PATH_SBI = "scraped_csv/sbitt.csv"
+# One row per publication date; repeated scrapes of the same rate write nothing
+sbi_csv = KeyedCsv(CSV_FILE_PATH_SBI, ["date", "sbi_tt_sell"], key=["date"])
+tick_store = TickStore()
+http_client = HttpClient(name="sbi_tt")
+last_sbi_tt_sell = None  # last parsed result, reused when the page is unchanged (304)
 
 # Function to scrape SBI TT Sell rate
 def scrape_sbi_tt_sell():
-    url = "https://officialforexrates.com/"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36"
-    }
+    global last_sbi_tt_sell
+    url = SBI_TT_URL
+    response = http_client.get(url)
 
-    response = requests.get(url, headers=headers)
+    if response.status_code == 304:
+        if last_sbi_tt_sell:
+            return last_sbi_tt_sell
+        # Unchanged, but the last full page did not parse: fetch it again in full
+        response = http_client.get(url, conditional=False)
 
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, "html.parser")
-        table = soup.find("table")
-        data = []
-
-        if table:
-            thead = table.find("thead")
-            if thead:
-                date_row = thead.find("tr")
-                date_cells = date_row.find_all("th")
-                Date = date_cells[1].text.strip() if len(date_cells) > 0 else "N/A"
-            else:
-                Date = "N/A"
-
-            tbody = table.find("tbody")
-            if tbody:
-                rows = tbody.find_all("tr")
-                for row in rows[:1]:  # Get first row
-                    columns = row.find_all("td")
-                    sbi_tt_sell = columns[1].text.strip() if len(columns) > 1 else "N/A"
-                    data.append({"date": Date, "sbi_tt_sell": sbi_tt_sell})
+        with stage("sbi_tt", "extraction"):
+            data = parse_sbi_tt_sell(response.text)
 
+        if data is not None:
             # Save to CSV
-            df = pd.DataFrame(data)
-            os.makedirs("scraped_csv", exist_ok=True)
-            write_header = not os.path.exists(CSV_FILE_PATH_SBI)
-            df.to_csv(CSV_FILE_PATH_SBI, mode="a", index=False, header=write_header)
+            with stage("sbi_tt", "persistence"):
+                sbi_csv.upsert(data)
+                for row in data:
+                    tick_store.append("sbi_tt", "USDINR", row["date"], row["sbi_tt_sell"])
 
+            last_sbi_tt_sell = data
             return data
         else:
             return None
     return None
 
 # API route to get SBI TT Sell rate
+# The rate changes once per business day: serve it from memory until the next
+# publication window (SBI_TT in market_calendar.json) and only poll upstream there
+sbi_cache = PublicationCache(
+    scrape_sbi_tt_sell, window="SBI_TT", name="sbi_tt",
+    published=lambda data: publication_date(row["date"] for row in data),
+)
+
 @app.route('/scrape-sbi-tt', methods=['GET'])
 def get_sbi_tt_sell():
-    data = scrape_sbi_tt_sell()
+    data = sbi_cache.get()
     
     if data:
         return jsonify({"success": True, "data": data, "message": "SBI TT Sell rate scraped successfully"})
     else:
         return jsonify({"error": "Failed to scrape data or table not found"}), 500
 
+@app.route('/history', methods=['GET'])
+def get_sbi_tt_history():
+    return jsonify(tick_store.history_from_args("sbi_tt", request.args))
+
+@app.route('/stats', methods=['GET'])
+def get_sbi_tt_stats():
+    return jsonify({"cache": sbi_cache.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text: stage latencies, upstream status codes, data age"""
+    return metrics_response()
+
 if __name__ == '__main__':
     app.run(debug=True, host="0.0.0.0", port=5001)  # Change port to 5001
 
@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from market_schedule import MarketHours
+
+
+class ScrapeCache:
+    """Single-flight TTL cache with stale-while-revalidate in front of a scrape function.
+
+    * fresh (age < ttl): the cached value is returned immediately
+    * stale (age < ttl + stale_ttl): the cached value is returned immediately
+      and one background refresh is started
+    * missing or expired: the caller waits for the scrape, and concurrent
+      callers wait on the same in-flight scrape instead of starting their own
+
+    A result that fails ``is_valid`` is handed to the waiting callers but
+    never replaces a good cached value. A caller that waits longer than
+    ``wait_timeout`` for someone else's scrape gets the last good value
+    (None if there is none), like a failed scrape.
+    """
+
+    def __init__(self, fetch, ttl, stale_ttl=0, name="scrape", is_valid=bool, wait_timeout=120):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self.is_valid = is_valid
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._value = None
+        self._fetched_at = None
+        self._inflight = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def _start_fetch(self):
+        """Become the leader for a new scrape; call with the lock held"""
+        self._inflight = Future()
+        return self._inflight
+
+    def _run_fetch(self, future):
+        try:
+            value = self.fetch()
+        except Exception as e:
+            print(f"❌ {self.name} scrape failed: {e}")
+            value = None
+        with self._lock:
+            if self.is_valid(value):
+                self._store(value)
+            self._inflight = None
+        future.set_result(value)
+        return value
+
+    def _store(self, value):
+        """Keep a good result; call with the lock held"""
+        self._value = value
+        self._fetched_at = time.monotonic()
+
+    def _freshness(self):
+        """'fresh', 'stale' or 'expired' for the cached value; call with the lock held"""
+        if self._fetched_at is None:
+            return "expired"
+        age = time.monotonic() - self._fetched_at
+        if age < self.ttl:
+            return "fresh"
+        if age < self.ttl + self.stale_ttl:
+            return "stale"
+        return "expired"
+
+    def get(self):
+        with self._lock:
+            freshness = self._freshness()
+            if freshness == "fresh":
+                self.hits += 1
+                return self._value
+            if freshness == "stale":
+                self.stale_hits += 1
+                if self._inflight is None:
+                    future = self._start_fetch()
+                    threading.Thread(target=self._run_fetch, args=(future,), daemon=True).start()
+                return self._value
+            if self._inflight is not None:
+                self.coalesced += 1
+                future, leader = self._inflight, False
+            else:
+                self.misses += 1
+                future, leader = self._start_fetch(), True
+
+        if leader:
+            return self._run_fetch(future)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except FutureTimeoutError:
+            print(f"⚠️ {self.name} scrape still running after {self.wait_timeout}s, serving the last value")
+            with self._lock:
+                self.timeouts += 1
+                return self._value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "age": None if self._fetched_at is None else round(time.monotonic() - self._fetched_at, 3),
+                "refreshing": self._inflight is not None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "timeouts": self.timeouts,
+            }
+
+
+class PublicationCache(ScrapeCache):
+    """ScrapeCache for a value the upstream publishes once per business day.
+
+    ``published(value)`` returns the publication date of a result
+    ('YYYY-MM-DD'). Once the cached value carries the date of the latest
+    publication window that has opened (from ``market_calendar.json``) it is
+    served from memory until the next window. Inside a window, while the new
+    value has not shown up yet, upstream is polled at most every
+    ``poll_interval`` seconds in the background; outside it nothing is
+    fetched at all.
+    """
+
+    def __init__(self, fetch, window, published, poll_interval=300, calendar=None, **kwargs):
+        super().__init__(fetch, ttl=poll_interval, **kwargs)
+        self.hours = MarketHours(window, calendar)
+        self.published = published
+        self.poll_interval = poll_interval
+        self._published_on = None
+        self._attempted_at = None
+
+    def _run_fetch(self, future):
+        with self._lock:
+            self._attempted_at = time.monotonic()
+        return super()._run_fetch(future)
+
+    def _store(self, value):
+        super()._store(value)
+        self._published_on = self.published(value)
+
+    def expected_date(self):
+        """Date of the newest publication the upstream should have by now"""
+        start = self.hours.last_session_start()
+        return start.strftime("%Y-%m-%d") if start else None
+
+    def _freshness(self):
+        if self._fetched_at is None:
+            return "expired"
+        expected = self.expected_date()
+        if self._published_on and expected and self._published_on >= expected:
+            return "fresh"
+        if not self.hours.is_open():
+            # Missed today's window (late or unlisted holiday): wait for the next one
+            return "fresh"
+        if time.monotonic() - self._attempted_at < self.poll_interval:
+            return "fresh"
+        return "stale"
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats["published"] = self._published_on
+        stats["expected"] = self.expected_date()
+        stats["window_open"] = self.hours.is_open()
+        return stats
@@ -0,0 +1,79 @@
+import threading
+
+from metrics import SELECTOR_MISSES, SELECTOR_WAIT_SECONDS
+from snapshot import save_snapshot, load_snapshot
+
+
+class SelectorCache:
+    """Persisted hit statistics for ordered selector fallbacks.
+
+    For each field the selector that worked last time is tried first, then
+    the others by smoothed hit rate, then in their original order. Misses
+    therefore sink to the back and a steady-state scrape needs one wait per
+    field instead of walking the whole list.
+    """
+
+    def __init__(self, path, name="selectors"):
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        saved = load_snapshot(path) or {}
+        self._stats = saved.get("stats", {})
+        self._last_hit = saved.get("last_hit", {})
+
+    def ranked(self, field, selectors, keys=None):
+        """Return [(key, selector), ...] in the order they should be tried.
+
+        ``keys`` identify selectors whose text changes between runs (e.g. the
+        contract-month XPaths embed the month name); they default to the
+        selector itself.
+        """
+        keys = keys or selectors
+        with self._lock:
+            stats = self._stats.get(field, {})
+            last = self._last_hit.get(field)
+
+        def score(item):
+            index, key = item
+            entry = stats.get(key, {})
+            hits, misses = entry.get("hits", 0), entry.get("misses", 0)
+            hit_rate = (hits + 1) / (hits + misses + 2)
+            return (key != last, -hit_rate, index)
+
+        order = sorted(enumerate(keys), key=score)
+        return [(key, selectors[index]) for index, key in order]
+
+    def record(self, field, key, hit, elapsed):
+        SELECTOR_WAIT_SECONDS.observe(elapsed, service=self.name, field=field)
+        if not hit:
+            SELECTOR_MISSES.inc(service=self.name, field=field)
+        with self._lock:
+            entry = self._stats.setdefault(field, {}).setdefault(
+                key, {"hits": 0, "misses": 0, "time_spent": 0.0}
+            )
+            entry["hits" if hit else "misses"] += 1
+            entry["time_spent"] += elapsed
+            if hit:
+                self._last_hit[field] = key
+
+    def stats(self):
+        """Per-field, per-selector hit rate and total seconds spent waiting"""
+        with self._lock:
+            return {
+                field: {
+                    key: {
+                        "hits": entry["hits"],
+                        "misses": entry["misses"],
+                        "hit_rate": round(entry["hits"] / max(1, entry["hits"] + entry["misses"]), 3),
+                        "time_spent": round(entry["time_spent"], 3),
+                        "last_hit": self._last_hit.get(field) == key,
+                    }
+                    for key, entry in selectors.items()
+                }
+                for field, selectors in self._stats.items()
+            }
+
+    def save(self):
+        with self._lock:
+            data = {"stats": self._stats, "last_hit": self._last_hit}
+            save_snapshot(self.path, data)
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+import os
+
+
+def save_snapshot(path, data):
+    """Atomically write data as JSON so readers never see a half-written file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Return the saved snapshot, or None if it is missing or unreadable"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_last_csv_row(path, block_size=4096):
+    """Return the last CSV row as a dict keyed by the header.
+
+    Only the header line and the tail of the file are read, so the cost does
+    not depend on how much history the file holds.
+    """
+    try:
+        with open(path, "rb") as f:
+            header_line = f.readline()
+            header_end = f.tell()
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            tail = b""
+            # Walk backwards until the tail holds one complete non-empty line
+            while position > header_end:
+                step = min(block_size, position - header_end)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+                if tail.rstrip(b"\r\n").count(b"\n") >= 1:
+                    break
+    except OSError:
+        return None
+
+    lines = tail.rstrip(b"\r\n").splitlines()
+    if not lines or not lines[-1].strip():
+        return None
+    header = next(csv.reader(io.StringIO(header_line.decode("utf-8"))), None)
+    row = next(csv.reader(io.StringIO(lines[-1].decode("utf-8"))), None)
+    if not header or not row:
+        return None
+    return dict(zip(header, row))
@@ -0,0 +1,147 @@
+"""Pluggable HTML table extraction for the requests-based scrapers.
+
+All three daily-rate pages only need the cell text of their <table>s, so
+instead of building a full BeautifulSoup tree of the page each backend only
+materialises the tables:
+
+  * lxml        - incremental HTMLPullParser; stops reading the page as soon
+                  as the first table closes when only one is needed
+  * selectolax  - Lexbor-based parser, optional (pip install selectolax);
+                  being an HTML5 parser it puts rows of a table without an
+                  explicit <tbody> into ``body`` as well
+  * bs4         - BeautifulSoup restricted to <table> with a SoupStrainer
+
+Pick one with the HTML_PARSER env var (default lxml) or per call.
+"""
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+
+DEFAULT_BACKEND = os.getenv("HTML_PARSER", "lxml")
+
+FEED_CHUNK = 16 * 1024
+
+
+class Table:
+    """Cell text of one <table>.
+
+    ``head``  - <th> texts of each row inside <thead>
+    ``body``  - <td> texts of each row inside <tbody>
+    ``rows``  - <td> texts of every row of the table, in document order
+    """
+
+    __slots__ = ("head", "body", "rows")
+
+    def __init__(self):
+        self.head = []
+        self.body = []
+        self.rows = []
+
+
+def _lxml_text(element):
+    return "".join(element.itertext()).strip()
+
+
+def _lxml_table(element):
+    table = Table()
+    for row in element.iter("tr"):
+        cells = [_lxml_text(cell) for cell in row.iterchildren("td")]
+        table.rows.append(cells)
+        section = row.getparent().tag
+        if section == "thead":
+            table.head.append([_lxml_text(cell) for cell in row.iterchildren("th")])
+        elif section == "tbody":
+            table.body.append(cells)
+    return table
+
+
+def _tables_lxml(page_html, first_only):
+    encoding = None
+    if isinstance(page_html, str):
+        page_html, encoding = page_html.encode("utf-8"), "utf-8"
+    parser = etree.HTMLPullParser(events=("end",), tag="table", encoding=encoding)
+    tables = []
+    for start in range(0, len(page_html), FEED_CHUNK):
+        parser.feed(page_html[start:start + FEED_CHUNK])
+        for _, element in parser.read_events():
+            tables.append(_lxml_table(element))
+            element.clear()
+            if first_only:
+                return tables
+    parser.close()
+    for _, element in parser.read_events():
+        tables.append(_lxml_table(element))
+    return tables[:1] if first_only else tables
+
+
+def _tables_selectolax(page_html, first_only):
+    if HTMLParser is None:
+        raise RuntimeError("selectolax is not installed (pip install selectolax)")
+    tree = HTMLParser(page_html)
+    nodes = [tree.css_first("table")] if first_only else tree.css("table")
+    tables = []
+    for node in nodes:
+        if node is None:
+            continue
+        table = Table()
+        for row in node.css("tr"):
+            cells = [cell.text(deep=True).strip() for cell in row.iter() if cell.tag == "td"]
+            table.rows.append(cells)
+            section = row.parent.tag if row.parent else None
+            if section == "thead":
+                table.head.append([cell.text(deep=True).strip() for cell in row.iter() if cell.tag == "th"])
+            elif section == "tbody":
+                table.body.append(cells)
+        tables.append(table)
+    return tables
+
+
+def _tables_bs4(page_html, first_only):
+    soup = BeautifulSoup(page_html, "html.parser", parse_only=SoupStrainer("table"))
+    nodes = [soup.find("table")] if first_only else soup.find_all("table")
+    tables = []
+    for node in nodes:
+        if node is None:
+            continue
+        table = Table()
+        for row in node.find_all("tr"):
+            cells = [cell.get_text().strip() for cell in row.find_all("td", recursive=False)]
+            table.rows.append(cells)
+            section = row.parent.name if row.parent else None
+            if section == "thead":
+                table.head.append([cell.get_text().strip() for cell in row.find_all("th", recursive=False)])
+            elif section == "tbody":
+                table.body.append(cells)
+        tables.append(table)
+    return tables
+
+
+BACKENDS = {
+    "lxml": _tables_lxml,
+    "selectolax": _tables_selectolax,
+    "bs4": _tables_bs4,
+}
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != "selectolax" or HTMLParser is not None]
+
+
+def parse_tables(page_html, first_only=False, backend=None):
+    """Every <table> in the page (or just the first) as Table objects"""
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {backend}")
+    return BACKENDS[backend](page_html, first_only)
+
+
+def first_table(page_html, backend=None):
+    """The first <table> in the page, or None"""
+    tables = parse_tables(page_html, first_only=True, backend=backend)
+    return tables[0] if tables else None
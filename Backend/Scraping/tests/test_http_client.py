@@ -0,0 +1,136 @@
+"""HttpClient against a local stand-in server: conditional GETs, retries, persisted validators.
+
+Run from Backend/Scraping:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from http_client import HttpClient  # noqa: E402
+
+ETAG = '"rates-v1"'
+LAST_MODIFIED = "Fri, 04 Apr 2025 07:48:28 GMT"
+BODY = b"<table><tr><td>04-04-2025</td><td>85.52</td></tr></table>"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        hits = self.server.hit(self.path)
+        if self.path == "/etag":
+            if self.headers.get("If-None-Match") == ETAG:
+                return self.reply(304, {"ETag": ETAG})
+            return self.reply(200, {"ETag": ETAG}, BODY)
+        if self.path == "/last-modified":
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                return self.reply(304, {"Last-Modified": LAST_MODIFIED})
+            return self.reply(200, {"Last-Modified": LAST_MODIFIED}, BODY)
+        if self.path == "/flaky":
+            # Two 503s, then the page
+            return self.reply(503) if hits <= 2 else self.reply(200, {}, BODY)
+        if self.path == "/down":
+            return self.reply(503)
+        return self.reply(404)
+
+    def reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.hits = {}
+        self._lock = threading.Lock()
+
+    def hit(self, path):
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+            return self.hits[path]
+
+
+class HttpClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.hits.clear()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("backoff", 0)
+        return HttpClient(timeout=(2, 5), name="test", **kwargs)
+
+    def test_etag_makes_the_second_get_a_304(self):
+        client = self.client()
+        url = f"{self.base_url}/etag"
+        first = client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, BODY)
+        self.assertEqual(client.get(url).status_code, 304)
+        # conditional=False (and forget) download the full page again
+        self.assertEqual(client.get(url, conditional=False).status_code, 200)
+        client.forget(url)
+        self.assertEqual(client.get(url).status_code, 200)
+
+    def test_last_modified_makes_the_second_get_a_304(self):
+        client = self.client()
+        url = f"{self.base_url}/last-modified"
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(client.get(url).status_code, 304)
+
+    def test_5xx_is_retried(self):
+        response = self.client(retries=3).get(f"{self.base_url}/flaky")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits["/flaky"], 3)
+
+    def test_retries_give_up_after_the_limit(self):
+        with self.assertRaises(requests.RequestException):
+            self.client(retries=2).get(f"{self.base_url}/down")
+        self.assertEqual(self.server.hits["/down"], 3)
+
+    def test_4xx_is_not_retried(self):
+        response = self.client(retries=3).get(f"{self.base_url}/missing")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.server.hits["/missing"], 1)
+
+    def test_validators_path_survives_a_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "http_validators.json")
+            url = f"{self.base_url}/etag"
+            self.assertEqual(self.client(validators_path=path).get(url).status_code, 200)
+            self.assertTrue(os.path.exists(path))
+            # A new client (the next run of a one-shot script) sends the saved ETag
+            restarted = self.client(validators_path=path)
+            self.assertEqual(restarted.get(url).status_code, 304)
+            restarted.forget(url)
+            self.assertEqual(self.client(validators_path=path).get(url).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""LME_CSP_scrap.scrape_latest against a local stand-in for the westmetall page.
+
+A page that downloads but does not parse must not leave validators behind,
+or every later run gets a 304 and the day's price is never stored.
+
+Run from Backend/Scraping:
+    python -m pytest tests
+"""
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import HttpClient  # noqa: E402
+
+ETAG = '"lme-cash-v1"'
+# The table has not rendered: nothing for parse_lme_cash to read
+UNPARSEABLE = b"<html><body><p>Please enable JavaScript</p></body></html>"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            return self.reply(304, {"ETag": ETAG})
+        return self.reply(200, {"ETag": ETAG}, UNPARSEABLE)
+
+    def reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.requests = []
+
+
+class ScrapeLatestTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        # The module keeps its CSV and validators under a relative scraped_csv/
+        cls.cwd = os.getcwd()
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.chdir(cls.tmp.name)
+        cls.module = importlib.import_module("LME_CSP_scrap")
+
+    @classmethod
+    def tearDownClass(cls):
+        os.chdir(cls.cwd)
+        cls.tmp.cleanup()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_unparseable_page_is_fetched_in_full_next_run(self):
+        module = self.module
+        module.url = f"http://127.0.0.1:{self.server.server_address[1]}/markdaten.php"
+        module.http_client = HttpClient(validators_path=os.path.join(self.tmp.name, "validators.json"))
+
+        module.scrape_latest()
+        module.scrape_latest()
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn("If-None-Match", self.server.requests[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""ScrapeCache: a failed scrape must not replace or refresh the last good result.
+
+Run from Backend/Scraping:
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrape_cache import ScrapeCache  # noqa: E402
+
+GOOD = {"timestamp": "2025-04-04 13:18:28", "contracts": {"april": {"price": "232.45"}}}
+
+
+class FlakyLoader:
+    """Succeeds on the first call, then fails the way the MCX scrape does"""
+
+    def __init__(self, fail_by_raising=False):
+        self.calls = 0
+        self.fail_by_raising = fail_by_raising
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls == 1:
+            return GOOD
+        if self.fail_by_raising:
+            raise RuntimeError("page did not render")
+        return {"error": "page did not render"}
+
+
+def make_cache(loader, ttl, stale_ttl):
+    return ScrapeCache(loader, ttl=ttl, stale_ttl=stale_ttl, name="test",
+                       is_valid=lambda data: bool(data) and "error" not in data)
+
+
+class ScrapeCacheFailureTest(unittest.TestCase):
+    def wait_for_refresh(self, cache):
+        deadline = time.monotonic() + 5
+        while cache.stats()["refreshing"]:
+            self.assertLess(time.monotonic(), deadline, "background refresh never finished")
+            time.sleep(0.01)
+
+    def test_failed_background_refresh_keeps_value_and_age(self):
+        loader = FlakyLoader()
+        cache = make_cache(loader, ttl=0, stale_ttl=60)
+        self.assertEqual(cache.get(), GOOD)
+        time.sleep(0.05)
+
+        # Stale: served from the cache while a refresh (which fails) runs
+        self.assertEqual(cache.get(), GOOD)
+        self.wait_for_refresh(cache)
+        self.assertEqual(loader.calls, 2)
+
+        self.assertEqual(cache.get(), GOOD)
+        self.assertGreaterEqual(cache.stats()["age"], 0.05)
+
+    def test_failed_scrape_after_expiry_is_reported_but_not_cached(self):
+        for fail_by_raising in (False, True):
+            with self.subTest(fail_by_raising=fail_by_raising):
+                loader = FlakyLoader(fail_by_raising)
+                cache = make_cache(loader, ttl=0, stale_ttl=0)
+                self.assertEqual(cache.get(), GOOD)
+                time.sleep(0.05)
+
+                # Expired: the caller waits for the scrape and sees it fail
+                result = cache.get()
+                self.assertFalse(result and "error" not in result)
+                self.assertEqual(loader.calls, 2)
+
+                stats = cache.stats()
+                self.assertGreaterEqual(stats["age"], 0.05)
+                self.assertEqual(cache._value, GOOD)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,303 @@
+"""Embedded SQLite time-series store shared by all scraper services.
+
+Every scraper writes numeric ticks keyed on (source, instrument, ts) so the
+/history endpoints can answer a time-range query from the primary-key index
+instead of re-reading a CSV. The database runs in WAL mode, so one writer
+and any number of readers (the other Flask processes) can share the file.
+
+Import the existing CSV history once with:
+    python timeseries_store.py --import-csv
+"""
+import argparse
+import atexit
+import csv
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+from metrics import DATA_AGE
+
+DB_PATH = os.getenv("TIMESERIES_DB", os.path.join("scraped_csv", "timeseries.db"))
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticks (
+    source      TEXT NOT NULL,
+    instrument  TEXT NOT NULL,
+    ts          TEXT NOT NULL,
+    value       REAL,
+    change      REAL,
+    change_pct  REAL,
+    extra       TEXT,
+    PRIMARY KEY (source, instrument, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ticks_source_ts ON ticks (source, ts);
+"""
+
+_number_re = re.compile(r"[-+]?\d[\d,]*(?:\.\d+)?")
+_change_re = re.compile(r"([-+]?\d[\d,]*(?:\.\d+)?)\s*\(+\s*([-+]?\d+(?:\.\d+)?)\s*%")
+
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%d-%m-%Y",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%d %B %Y",
+    "%d. %B %Y",
+]
+
+
+def parse_number(text):
+    """'2,421.70' -> 2421.7; None for N/A or anything non-numeric"""
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _number_re.search(str(text))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", ""))
+
+
+def parse_change(text):
+    """'-34.35 ((-1.40%))' -> (-34.35, -1.4)"""
+    if not text:
+        return None, None
+    match = _change_re.search(str(text))
+    if match:
+        return float(match.group(1).replace(",", "")), float(match.group(2))
+    return parse_number(text), None
+
+
+def parse_timestamp(text):
+    """Normalise the date/time strings the scrapers see to TS_FORMAT"""
+    if isinstance(text, datetime):
+        return text.strftime(TS_FORMAT)
+    text = str(text).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(TS_FORMAT)
+        except ValueError:
+            continue
+    return None
+
+
+def publication_date(texts):
+    """Newest of the given date strings as 'YYYY-MM-DD', or None"""
+    parsed = [ts for ts in (parse_timestamp(text) for text in texts) if ts]
+    return max(parsed)[:10] if parsed else None
+
+
+def parse_time_bound(text, end=False):
+    """Parse a from/to query argument; a bare date as 'to' covers the whole day"""
+    if not text:
+        return None
+    ts = parse_timestamp(text)
+    if ts and end and len(text.strip()) == 10:
+        day = datetime.strptime(ts, TS_FORMAT) + timedelta(days=1, seconds=-1)
+        ts = day.strftime(TS_FORMAT)
+    return ts
+
+
+class TickStore:
+    """Batched writer and range reader over the ticks table"""
+
+    def __init__(self, path=DB_PATH, batch_size=50, flush_interval=5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+        atexit.register(self.flush)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_row(source, instrument, ts, value, change=None, change_pct=None, extra=None):
+        return (
+            source,
+            instrument,
+            parse_timestamp(ts) or datetime.now().strftime(TS_FORMAT),
+            parse_number(value),
+            parse_number(change),
+            parse_number(change_pct),
+            json.dumps(extra) if extra else None,
+        )
+
+    def append(self, source, instrument, ts, value, change=None, change_pct=None, extra=None):
+        """Queue one tick; written in a batch once enough ticks or time accumulate"""
+        row = self.make_row(source, instrument, ts, value, change, change_pct, extra)
+        DATA_AGE.mark(source=source, instrument=instrument)
+        with self._lock:
+            self._pending.append(row)
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if rows:
+            self.insert_many(rows)
+
+    def insert_many(self, rows):
+        """Write prepared rows in one transaction; a repeated key replaces the old row"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO ticks "
+                "(source, instrument, ts, value, change, change_pct, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def timestamps(self, source, instrument):
+        """Set of every ts already stored for one instrument"""
+        self.flush()
+        rows = self._connect().execute(
+            "SELECT ts FROM ticks WHERE source = ? AND instrument = ?", (source, instrument)
+        ).fetchall()
+        return {ts for ts, in rows}
+
+    def history(self, source, instrument=None, start=None, end=None, limit=5000):
+        """Ticks for source (and optionally one instrument) between start and end, oldest first"""
+        self.flush()
+        sql = "SELECT instrument, ts, value, change, change_pct, extra FROM ticks WHERE source = ?"
+        params = [source]
+        if instrument:
+            sql += " AND instrument = ?"
+            params.append(instrument)
+        if start:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end:
+            sql += " AND ts <= ?"
+            params.append(end)
+        sql += " ORDER BY ts LIMIT ?"
+        params.append(limit)
+
+        rows = self._connect().execute(sql, params).fetchall()
+        return [
+            {
+                "instrument": instrument_,
+                "timestamp": ts,
+                "value": value,
+                "change": change,
+                "change_pct": change_pct,
+                **(json.loads(extra) if extra else {}),
+            }
+            for instrument_, ts, value, change, change_pct, extra in rows
+        ]
+
+    def history_from_args(self, source, args):
+        """Run history() from Flask request.args (from, to, instrument, limit)"""
+        start = parse_time_bound(args.get("from"))
+        end = parse_time_bound(args.get("to"), end=True)
+        try:
+            limit = min(int(args.get("limit", 5000)), 50000)
+        except ValueError:
+            limit = 5000
+        rows = self.history(source, args.get("instrument"), start, end, limit)
+        return {"success": True, "source": source, "from": start, "to": end, "count": len(rows), "data": rows}
+
+
+# ---------------------------------------------------------------------------
+# One-time import of the CSV history written before the store existed
+
+def _read_csv(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def import_lme_3m(store, path):
+    rows = []
+    for record in _read_csv(path)[1:]:
+        # Early rows were written before the Timestamp column existed
+        if len(record) < 4 or not record[3]:
+            continue
+        value, time_span, rate_change, timestamp = record[:4]
+        change, change_pct = parse_change(rate_change)
+        rows.append(store.make_row("lme_3m", "aluminium", timestamp, value, change, change_pct,
+                                   {"time_span": time_span}))
+    return store.insert_many(rows)
+
+
+def import_mcx(store, path):
+    records = _read_csv(path)
+    if not records or "Timestamp" not in records[0]:
+        return 0
+    header = records[0]
+    months = [col[:-len("_Price")] for col in header if col.endswith("_Price")]
+    rows = []
+    for record in records[1:]:
+        entry = dict(zip(header, record))
+        for month in months:
+            price = parse_number(entry.get(f"{month}_Price"))
+            if price is None:
+                continue
+            change, change_pct = parse_change(entry.get(f"{month}_Rate_Change"))
+            rows.append(store.make_row("mcx", month, entry["Timestamp"], price, change, change_pct))
+    return store.insert_many(rows)
+
+
+def import_daily(store, path, source, instrument):
+    """Two-column (date, value) files: sbitt.csv, LME_CSP_Scarp.csv, rbi_reference_rates.csv"""
+    rows = []
+    for record in _read_csv(path)[1:]:
+        if len(record) < 2 or parse_number(record[1]) is None:
+            continue
+        ts = parse_timestamp(record[0])
+        if ts:
+            rows.append(store.make_row(source, instrument, ts, record[1]))
+    return store.insert_many(rows)
+
+
+def import_existing_csvs(store, csv_dir="scraped_csv"):
+    counts = {
+        "lme_3m": import_lme_3m(store, os.path.join(csv_dir, "3_months_LME_scrap.csv")),
+        "mcx": import_mcx(store, "mcx_aluminium_prices.csv"),
+        "sbi_tt": import_daily(store, os.path.join(csv_dir, "sbitt.csv"), "sbi_tt", "USDINR"),
+        "lme_cash": import_daily(store, os.path.join(csv_dir, "LME_CSP_Scarp.csv"), "lme_cash", "aluminium"),
+        "rbi_ref": import_daily(store, os.path.join(csv_dir, "rbi_reference_rates.csv"), "rbi_ref", "USDINR"),
+    }
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the scraper time-series store")
+    parser.add_argument("--import-csv", action="store_true", help="import the existing scraped CSV files")
+    parser.add_argument("--csv-dir", default="scraped_csv")
+    args = parser.parse_args()
+
+    if args.import_csv:
+        for source, count in import_existing_csvs(TickStore(), args.csv_dir).items():
+            print(f"✅ Imported {count} rows for {source}")
+    else:
+        parser.print_help()
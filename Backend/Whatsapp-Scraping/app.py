@@ -1,10 +1,19 @@
 from dotenv import load_dotenv
 import os
+import sys
 from flask import Flask, request, Response, jsonify
 from twilio.twiml.messaging_response import MessagingResponse
 from flask_cors import CORS
-import re
 from datetime import datetime
+from message_parser import parse_message
+from price_store import PriceStore
+from ingest import IngestQueue
+from price_history import INTERVALS, PriceHistory
+from structured_logging import AccessLog, redact_fields, setup_logging
+
+# Metrics are shared with the scrapers (Backend/Scraping/metrics.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Scraping'))
+from metrics import DATA_AGE, REGISTRY, metrics_response, stage
 
 # Load environment variables
 load_dotenv()
@@ -12,6 +21,10 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# JSON logs written from a background thread; access logs sampled per route
+logger = setup_logging()
+AccessLog(logger).init_app(app)
+
 # Global variable to store the latest price data
 latest_price_data = {
     'spot_price': None,
@@ -20,197 +33,214 @@ latest_price_data = {
     'last_updated': None
 }
 
-def parse_metal_price(message):
-    """Function to parse metal price message"""
+# Latest quote of every metal in the broadcasts, same shape as latest_price_data
+latest_prices = {}
+
+# Parsed ticks and the MessageSid log used to drop duplicate deliveries
+price_store = PriceStore()
+
+# Recent ticks and 1m/5m/1h candles kept in memory, refilled from the store on start
+price_history = PriceHistory(price_store)
+price_history.load()
+
+# Replies are sent from the worker through the REST API, the webhook itself
+# only acknowledges; set WHATSAPP_REPLY=0 to stop replying
+reply_client = None
+if os.getenv('WHATSAPP_REPLY', '1') == '1':
+    if os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN'):
+        from twilio.rest import Client
+        reply_client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
+    else:
+        logger.warning('TWILIO_ACCOUNT_SID or TWILIO_AUTH_TOKEN not set, messages will be ingested without replies')
+
+def send_reply(meta, text):
+    """Reply to the sender of a message (no-op without Twilio credentials)"""
+    if reply_client is None or not meta.get('From') or not meta.get('To'):
+        return
     try:
-        print(f"Parsing message: {message}")
-        
-        # More lenient pattern that doesn't require MCX section
-        aluminium_match = re.search(r'\*\s*Aluminium\s*\*\s*(\d+(?:\.\d+)?)\s*\(([+-]?\d+(?:\.\d+)?)\)', message)
-        print(f"Regex match result: {aluminium_match}")
-        
-        if aluminium_match:
-            result = {
-                'price': float(aluminium_match.group(1)),
-                'change': float(aluminium_match.group(2))
-            }
-            print(f"Parsed result: {result}")
-            return result
-            
-        # If no match, try a more lenient pattern
-        print("Trying more lenient pattern...")
-        aluminium_match = re.search(r'Aluminium\s*(\d+(?:\.\d+)?)\s*\(([+-]?\d+(?:\.\d+)?)\)', message)
-        print(f"Lenient regex match result: {aluminium_match}")
-        
-        if aluminium_match:
-            result = {
-                'price': float(aluminium_match.group(1)),
-                'change': float(aluminium_match.group(2))
-            }
-            print(f"Parsed result from lenient pattern: {result}")
-            return result
-            
-        print("No Aluminium price pattern found")
-        return None
-    except Exception as error:
-        print(f'Error parsing message: {error}')
-        print(f'Message type: {type(message)}')
-        print(f'Message content: {message}')
-        return None
-
-@app.before_request
-def log_request_info():
-    """Log request details before processing"""
-    print('\n=== Incoming Request ===')
-    print(f'Time: {datetime.now().isoformat()}')
-    print(f'Method: {request.method}')
-    print(f'URL: {request.url}')
-    print('Headers:', dict(request.headers))
-    print('Form Data:', request.form.to_dict() if request.form else None)
-    print('JSON Data:', request.get_json(silent=True))
-    print('Raw Data:', request.get_data(as_text=True))
-    print('=====================\n')
+        reply_client.messages.create(from_=meta['To'], to=meta['From'], body=text)
+    except Exception:
+        logger.exception('error sending reply')
+
+def process_message(sid, message_body, received_at, meta):
+    """Ingest worker: parse one queued message, persist its ticks and publish them"""
+    global latest_price_data
+
+    with stage('whatsapp', 'extraction'):
+        quotes = parse_message(message_body)
+
+    if not quotes:
+        logger.info('could not parse metal price data', extra={'sid': sid, 'chars': len(message_body)})
+        send_reply(meta, 'Sorry, could not parse the metal price data from the message.')
+        return False
+
+    last_updated = received_at or datetime.now().isoformat()
+
+    with stage('whatsapp', 'persistence'):
+        price_store.append_ticks([
+            (last_updated, q['metal'], q['price'], q['change'], q['change_pct'], sid) for q in quotes
+        ])
+    for q in quotes:
+        DATA_AGE.mark(source='whatsapp', instrument=q['metal'])
+        price_history.add({
+            'timestamp': last_updated,
+            'metal': q['metal'],
+            'price': q['price'],
+            'change': q['change'],
+            'change_pct': q['change_pct']
+        })
+        latest_prices[q['metal']] = {
+            'spot_price': q['price'],
+            'price_change': q['change'],
+            'change_percentage': q['change_pct'],
+            'last_updated': last_updated
+        }
+
+    # The dashboard card has always shown MCX aluminium
+    if any(q['metal'] == 'aluminium' for q in quotes):
+        latest_price_data = latest_prices['aluminium']
+
+    logger.info('prices parsed', extra={
+        'sid': sid,
+        'metals': {q['metal']: q['price'] for q in quotes}
+    })
+
+    # Same reply as before for aluminium, one line for every other metal
+    lines = []
+    for q in quotes:
+        if q['metal'] == 'aluminium' and q['change'] is not None:
+            lines.insert(0, f"spotPrice = {q['price']:.2f},\nchange = {q['change']:.2f},\nchangePercent = {q['change_pct']:.2f},")
+        elif q['change'] is not None:
+            lines.append(f"{q['metal']} = {q['price']:.2f} ({q['change']:+.2f}, {q['change_pct']:+.2f}%)")
+        else:
+            lines.append(f"{q['metal']} = {q['price']:.2f}")
+    send_reply(meta, '\n'.join(lines))
+    return True
+
+ingest_queue = IngestQueue(price_store, process_message)
+# Under the multi-worker gateway only one process may re-queue unprocessed messages
+ingest_queue.start(recover=os.getenv('WHATSAPP_RECOVER', '1') == '1')
 
 @app.route('/')
 def home():
     """Root endpoint for testing"""
-    print('Root endpoint accessed')
     return 'WhatsApp Metal Price Parser is running!'
 
 @app.route('/api/price-data', methods=['GET'])
 def get_price_data():
-    """API endpoint to get the latest price data"""
+    """API endpoint to get the latest price data (aluminium, or ?metal=copper, ?metal=lme_zinc, ...)"""
     global latest_price_data
     
-    if latest_price_data['spot_price'] is None:
+    metal = request.args.get('metal', '').lower()
+    data = latest_prices.get(metal) if metal else latest_price_data
+    if not data or data['spot_price'] is None:
         return jsonify({
             'error': 'No price data available yet'
         }), 404
     
-    return jsonify(latest_price_data)
+    return jsonify(data)
+
+def int_arg(name, default, maximum):
+    try:
+        return max(1, min(int(request.args.get(name, default)), maximum))
+    except ValueError:
+        return default
+
+@app.route('/api/price-history', methods=['GET'])
+def get_price_history():
+    """Recent parsed ticks, oldest first (?metal=aluminium&from=ISO&limit=500)"""
+    metal = request.args.get('metal', 'aluminium').lower()
+    ticks = price_history.ticks(metal, request.args.get('from'), int_arg('limit', 500, 5000))
+    return jsonify({'metal': metal, 'count': len(ticks), 'data': ticks})
+
+@app.route('/api/ohlc', methods=['GET'])
+def get_ohlc():
+    """Candles built incrementally from the ticks (?interval=1m|5m|1h&metal=aluminium&limit=500)"""
+    interval = request.args.get('interval', '1m')
+    if interval not in INTERVALS:
+        return jsonify({'error': f"interval must be one of {', '.join(INTERVALS)}"}), 400
+    metal = request.args.get('metal', 'aluminium').lower()
+    candles = price_history.ohlc(metal, interval, int_arg('limit', 500, 1000))
+    return jsonify({'metal': metal, 'interval': interval, 'count': len(candles), 'data': candles})
 
 @app.route('/webhook', methods=['GET', 'POST'])
 def webhook():
-    """Webhook endpoint for both GET and POST requests"""
-    global latest_price_data
-    
-    print('\n=== Processing Webhook ===')
-    print(f'Time: {datetime.now().isoformat()}')
-    print('Method:', request.method)
-    print('Headers:', dict(request.headers))
-    print('Form Data:', request.form.to_dict() if request.form else None)
-    print('JSON Data:', request.get_json(silent=True))
-    print('Raw Data:', request.get_data(as_text=True))
-    
+    """Webhook endpoint: acknowledge at once, parsing happens on the ingest worker"""
     # For GET requests, just return a success message
     if request.method == 'GET':
-        print('Handling GET request to webhook')
         return 'Webhook endpoint is working! Send a POST request with a message to parse metal prices.'
     
-    # For POST requests, check the type of request
-    print('Handling POST request to webhook')
-    twiml = MessagingResponse()
+    # Get the request data based on content type
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+    else:
+        data = request.form.to_dict()
     
-    try:
-        # Get the request data based on content type
-        if request.is_json:
-            data = request.get_json()
-            print('Received JSON data:', data)
-            message_body = data.get('Body')
-        else:
-            data = request.form.to_dict()
-            print('Received form data:', data)
-            message_body = data.get('Body')
-        
-        # Check if this is a status update
-        if data.get('MessageStatus'):
-            print('Received status update:', data.get('MessageStatus'))
-            return 'OK'
-        
-        print('Message body:', message_body)
-        
-        if not message_body:
-            print('No message body found')
-            return 'OK'
-        
-        # Parse the metal price
-        result = parse_metal_price(message_body)
-        print('Parse result:', result)
-        
-        if result:
-            # Store the values in variables
-            spot_price = result['price']
-            price_change = result['change']
-            change_percentage = (price_change / spot_price) * 100
-            
-            # Update the global price data
-            latest_price_data = {
-                'spot_price': spot_price,
-                'price_change': price_change,
-                'change_percentage': change_percentage,
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            # Print the values in a formatted way
-            print('\n=== Scraped Metal Price Data ===')
-            print(f'Spot Price: {spot_price:.2f}')
-            print(f'Price Change: {price_change:.2f}')
-            print(f'Change Percentage: {change_percentage:.2f}%')
-            print('==============================\n')
-            
-            # Format the response using the new format
-            response_message = f"spotPrice = {spot_price:.2f},\nchange = {price_change:.2f},\nchangePercent = {change_percentage:.2f},"
-            print('Response message:', response_message)
-            twiml.message(response_message)
-        else:
-            print('Could not parse metal price data')
-            twiml.message('Sorry, could not parse the metal price data from the message.')
-    except Exception as e:
-        print(f'Error in webhook: {str(e)}')
-        import traceback
-        print(f'Traceback: {traceback.format_exc()}')
-        twiml.message('An error occurred while processing your message.')
+    # Check if this is a status update
+    if data.get('MessageStatus'):
+        logger.debug('status update on webhook', extra={'status': data.get('MessageStatus')})
+        return 'OK'
+    
+    message_body = data.get('Body')
+    if not message_body:
+        logger.debug('no message body found')
+        return 'OK'
+    
+    outcome = ingest_queue.submit(
+        data.get('MessageSid') or data.get('SmsMessageSid'),
+        message_body,
+        datetime.now().isoformat(),
+        {'From': data.get('From'), 'To': data.get('To')},
+    )
+    if outcome != 'queued':
+        logger.info('message not queued', extra={'outcome': outcome, 'sid': data.get('MessageSid')})
     
-    print('=== Webhook Processing Complete ===\n')
-    return Response(str(twiml), mimetype='text/xml')
+    if outcome == 'full':
+        # Worker is far behind; ask Twilio to try again instead of losing the tick
+        return Response('Busy, retry later', status=503, headers={'Retry-After': '5'})
+    
+    # Empty TwiML: any reply is sent by the worker once the message is parsed
+    return Response(str(MessagingResponse()), mimetype='text/xml')
+
+@app.route('/api/ingest-stats', methods=['GET'])
+def ingest_stats():
+    """Queue depth and counters of the webhook ingest pipeline"""
+    return jsonify(ingest_queue.stats())
+
+INGEST_GAUGES = {
+    'depth': REGISTRY.gauge('whatsapp_ingest_queue_depth', 'Messages waiting for the ingest worker'),
+    'last_lag_ms': REGISTRY.gauge('whatsapp_ingest_lag_ms', 'Queue wait of the last processed message'),
+}
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text: parse/persist latencies, data age per metal, ingest queue"""
+    ingest = ingest_queue.stats()
+    for key, gauge in INGEST_GAUGES.items():
+        if ingest[key] is not None:
+            gauge.set(ingest[key])
+    return metrics_response()
 
 @app.route('/status', methods=['GET', 'POST'])
 def status():
     """Status callback endpoint for both GET and POST requests"""
-    print('\n=== Status Update ===')
-    print('Method:', request.method)
-    
     # For GET requests, just return a success message
     if request.method == 'GET':
-        print('Handling GET request to status endpoint')
         return 'Status endpoint is working! This endpoint receives status updates for sent messages.'
     
-    # For POST requests, process the status update
-    print('Handling POST request to status endpoint')
-    
     # Get the request data based on content type
     if request.is_json:
-        data = request.get_json()
-        print('Received JSON data:', data)
+        data = request.get_json(silent=True) or {}
     else:
         data = request.form.to_dict()
-        print('Received form data:', data)
     
-    print('Status:', data.get('MessageStatus'))
-    print('SID:', data.get('MessageSid'))
-    print('To:', data.get('To'))
-    print('From:', data.get('From'))
-    print('Body:', data.get('Body'))
-    print('=== Status Update Complete ===\n')
+    logger.debug('status update', extra={'fields': redact_fields(data)})
     return 'OK'
 
 @app.errorhandler(Exception)
 def handle_error(error):
     """Error handling middleware"""
-    print(f"Error occurred: {str(error)}")
-    print(f"Error type: {type(error)}")
-    import traceback
-    print(f"Traceback: {traceback.format_exc()}")
+    logger.error('unhandled error', exc_info=error, extra={'path': request.path, 'type': type(error).__name__})
     return "Something broke! Error: " + str(error), 500
 
 if __name__ == '__main__':
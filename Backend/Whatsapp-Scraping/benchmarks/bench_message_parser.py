@@ -0,0 +1,124 @@
+"""Throughput of the WhatsApp message parser over a corpus of sample broadcasts.
+
+Compares:
+  legacy        the old parse_metal_price(): two uncompiled re.search calls, aluminium only
+  legacy-all    the same approach repeated for every metal (what extending it would cost)
+  single-pass   message_parser.parse_message()
+  backfill      message_parser.backfill() into a temporary SQLite store (parse + insert)
+
+The corpus is benchmarks/fixtures/sample_messages.txt (a chat export) or any
+--corpus files, repeated until --messages messages are parsed.
+
+Usage (from Backend/Whatsapp-Scraping):
+    python benchmarks/bench_message_parser.py --messages 50000
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from message_parser import METALS, backfill, parse_message, read_export  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "fixtures", "sample_messages.txt")
+
+
+def legacy_parse(message, metal="Aluminium"):
+    match = re.search(rf"\*\s*{metal}\s*\*\s*(\d+(?:\.\d+)?)\s*\(([+-]?\d+(?:\.\d+)?)\)", message)
+    if not match:
+        match = re.search(rf"{metal}\s*(\d+(?:\.\d+)?)\s*\(([+-]?\d+(?:\.\d+)?)\)", message)
+    if match:
+        return {"price": float(match.group(1)), "change": float(match.group(2))}
+    return None
+
+
+def legacy_parse_all(message):
+    quotes = []
+    for metal in METALS:
+        result = legacy_parse(message, metal.capitalize())
+        if result:
+            quotes.append(result)
+    return quotes
+
+
+def run(parse, bodies):
+    ticks = 0
+    started = time.perf_counter()
+    cpu_start = time.process_time()
+    for body in bodies:
+        result = parse(body)
+        if isinstance(result, list):
+            ticks += len(result)
+        elif result:
+            ticks += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "cpu_seconds": round(time.process_time() - cpu_start, 4),
+        "messages_per_s": round(len(bodies) / elapsed),
+        "ticks": ticks,
+        "ticks_per_s": round(ticks / elapsed),
+        "mb_per_s": round(sum(len(body) for body in bodies) / elapsed / 1e6, 2),
+    }
+
+
+def run_backfill(messages):
+    """Write the corpus out as JSONL with unique sids and import it into an empty store"""
+    workdir = tempfile.mkdtemp(prefix="parser_bench_")
+    dump = os.path.join(workdir, "messages.jsonl")
+    with open(dump, "w", encoding="utf-8") as f:
+        for i, (_, received_at, body) in enumerate(messages):
+            f.write(json.dumps({"sid": f"SMbench{i:08d}", "received_at": received_at, "body": body}) + "\n")
+    store = PriceStore(os.path.join(workdir, "prices.db"))
+    started = time.perf_counter()
+    cpu_start = time.process_time()
+    totals = backfill([dump], store)
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 4),
+        "cpu_seconds": round(time.process_time() - cpu_start, 4),
+        "messages_per_s": round(totals["messages"] / elapsed),
+        "ticks": totals["ticks"],
+        "ticks_per_s": round(totals["ticks"] / elapsed),
+        "mb_per_s": round(os.path.getsize(dump) / elapsed / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--corpus", nargs="*", default=[DEFAULT_CORPUS], help="chat export .txt or .jsonl files")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    corpus = [message for path in args.corpus for message in read_export(path)]
+    messages = list(itertools.islice(itertools.cycle(corpus), args.messages))
+    bodies = [body for _, _, body in messages]
+
+    results = {
+        "legacy": run(legacy_parse, bodies),
+        "legacy-all": run(legacy_parse_all, bodies),
+        "single-pass": run(parse_message, bodies),
+        "backfill": run_backfill(messages),
+    }
+    print(f"{len(bodies)} messages from {len(corpus)} distinct samples")
+    for name, result in results.items():
+        print(
+            f"{name:<12} {result['messages_per_s']:>9} msg/s  {result['ticks_per_s']:>9} ticks/s  "
+            f"{result['mb_per_s']:>6.2f} MB/s  ticks={result['ticks']}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
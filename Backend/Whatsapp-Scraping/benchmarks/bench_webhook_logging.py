@@ -0,0 +1,110 @@
+"""Benchmark /webhook throughput with request logging on and off.
+
+Each mode runs the Flask app in its own subprocess (logging is configured
+at import) and posts unique Twilio-style form messages through the test
+client. Log output goes to a real file, so the cost of writing it counts:
+
+  off       LOG_LEVEL=CRITICAL, nothing is logged
+  queued    default: JSON lines written by the QueueListener thread
+  sync      the same records written inline on the request thread (LOG_QUEUE=0)
+  sampled   queued, with webhook access logs sampled at 10%
+
+Usage (from Backend/Whatsapp-Scraping):
+    python benchmarks/bench_webhook_logging.py --requests 5000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+
+MODES = {
+    "off": {"LOG_LEVEL": "CRITICAL"},
+    "queued": {"LOG_LEVEL": "INFO"},
+    "sync": {"LOG_LEVEL": "INFO", "LOG_QUEUE": "0"},
+    "sampled": {"LOG_LEVEL": "INFO", "LOG_ROUTES": "webhook=0.1:INFO"},
+}
+
+
+def worker(requests, result_path):
+    """Post messages through the test client and write timings to result_path"""
+    sys.path.insert(0, APP_DIR)
+    import app as whatsapp_app
+
+    client = whatsapp_app.app.test_client()
+    form = {
+        "SmsMessageSid": "", "NumMedia": "0", "ProfileName": "Metal Desk",
+        "WaId": "919812345678", "SmsStatus": "received", "To": "whatsapp:+14155238886",
+        "NumSegments": "1", "AccountSid": "AC00000000000000000000000000000000",
+        "From": "whatsapp:+919812345678", "ApiVersion": "2010-04-01",
+    }
+    samples = []
+    started = time.perf_counter()
+    cpu_start = time.process_time()
+    for i in range(requests):
+        form["MessageSid"] = f"SMbench{i:08d}"
+        form["Body"] = f"*MCX*\n*Aluminium* {2600 + i % 50}.00 (+{i % 9}.00)\n*Copper* 812.40 (-3.10)"
+        start = time.perf_counter()
+        response = client.post("/webhook", data=form)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_start
+    samples.sort()
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "requests": requests,
+            "req_per_s": round(requests / elapsed, 1),
+            "p50_ms": round(statistics.median(samples) * 1000, 3),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+            "cpu_ms": round(cpu / requests * 1000, 3),
+        }, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--worker", metavar="RESULT_PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.requests, args.worker)
+        return
+
+    results = {}
+    for mode in args.modes:
+        # Fresh working directory per mode: its own SQLite file and log file
+        workdir = tempfile.mkdtemp(prefix=f"webhook_bench_{mode}_")
+        result_path = os.path.join(workdir, "result.json")
+        env = {**os.environ, **MODES[mode], "WHATSAPP_REPLY": "0"}
+        with open(os.path.join(workdir, "service.log"), "w") as log_file:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--requests", str(args.requests), "--worker", result_path],
+                cwd=workdir, env=env, stdout=log_file, check=True,
+            )
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+        result["log_bytes"] = os.path.getsize(os.path.join(workdir, "service.log"))
+        results[mode] = result
+        print(
+            f"{mode:<8} {result['req_per_s']:>8.1f} req/s  "
+            f"p50={result['p50_ms']:6.2f} ms  p99={result['p99_ms']:6.2f} ms  "
+            f"cpu/req={result['cpu_ms']:6.2f} ms  log={result['log_bytes'] / 1024:8.1f} KiB"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
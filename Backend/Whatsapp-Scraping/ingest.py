@@ -0,0 +1,144 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger("whatsapp.ingest")
+
+
+class IngestQueue:
+    """Acknowledge-then-process pipeline for inbound webhook messages.
+
+    submit() only records the message (deduplicated on MessageSid, in memory
+    and in the store) and puts it on a bounded queue, so the webhook can
+    answer Twilio immediately. A message the full queue turns away is
+    released again, so Twilio's retry gets in. A single worker thread then calls
+    ``handler(sid, body, received_at, meta)`` for each message in arrival
+    order; it returns True when a price was parsed.
+    """
+
+    def __init__(self, store, handler, maxsize=10000, recent=4096):
+        self.store = store
+        self.handler = handler
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._recent = OrderedDict()
+        self._recent_size = recent
+        self._lock = threading.Lock()
+        self._thread = None
+        self.queued = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.processed = 0
+        self.unparsed = 0
+        self.failed = 0
+        self.last_lag = None
+
+    def start(self, recover=True):
+        """Start the worker; with recover, first re-queue messages a previous run never processed"""
+        if self._thread is not None:
+            return
+        if recover:
+            self.recover()
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+
+    def recover(self):
+        """Re-queue messages that were acknowledged but never processed"""
+        for sid, body, received_at in self.store.pending_messages():
+            if self._remember(sid):
+                self._queue.put((sid, body, received_at, {}, time.monotonic()))
+
+    def _remember(self, sid):
+        """Add sid to the in-memory LRU; returns False if it was already there"""
+        with self._lock:
+            if sid in self._recent:
+                self._recent.move_to_end(sid)
+                return False
+            self._recent[sid] = True
+            if len(self._recent) > self._recent_size:
+                self._recent.popitem(last=False)
+            return True
+
+    def _forget(self, sid):
+        with self._lock:
+            self._recent.pop(sid, None)
+
+    def submit(self, sid, body, received_at=None, meta=None):
+        """Record and enqueue a message; returns 'queued', 'duplicate' or 'full'.
+
+        On 'full' (or an exception) nothing is kept, so Twilio's retry of the
+        same MessageSid is accepted instead of being dropped as a duplicate.
+        """
+        sid = sid or f"local-{uuid.uuid4().hex}"
+        # Cheap in-memory check first, the store catches redeliveries after a restart
+        if not self._remember(sid):
+            with self._lock:
+                self.duplicates += 1
+            return "duplicate"
+        try:
+            claimed = self.store.claim_message(sid, body, received_at)
+        except Exception:
+            self._forget(sid)
+            raise
+        if not claimed:
+            with self._lock:
+                self.duplicates += 1
+            return "duplicate"
+        try:
+            self._queue.put_nowait((sid, body, received_at, meta or {}, time.monotonic()))
+        except queue.Full:
+            self._release(sid)
+            with self._lock:
+                self.rejected += 1
+            return "full"
+        except Exception:
+            self._release(sid)
+            raise
+        with self._lock:
+            self.queued += 1
+        return "queued"
+
+    def _release(self, sid):
+        """Drop a claimed but unqueued message from the LRU and the store"""
+        self._forget(sid)
+        try:
+            self.store.release_message(sid)
+        except Exception:
+            # Left 'queued' in the store: recovered on the next start instead
+            logger.exception("error releasing message", extra={"sid": sid})
+
+    def _run(self):
+        while True:
+            sid, body, received_at, meta, enqueued = self._queue.get()
+            self.last_lag = time.monotonic() - enqueued
+            try:
+                parsed = self.handler(sid, body, received_at, meta)
+                status = "done" if parsed else "unparsed"
+            except Exception:
+                logger.exception("error processing message", extra={"sid": sid})
+                status = "failed"
+            try:
+                self.store.mark_message(sid, status)
+            except Exception:
+                logger.exception("error marking message", extra={"sid": sid})
+            with self._lock:
+                self.processed += 1
+                if status == "unparsed":
+                    self.unparsed += 1
+                elif status == "failed":
+                    self.failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": self._queue.qsize(),
+                "queued": self.queued,
+                "duplicates": self.duplicates,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "unparsed": self.unparsed,
+                "failed": self.failed,
+                "last_lag_ms": None if self.last_lag is None else round(self.last_lag * 1000, 2),
+            }
@@ -0,0 +1,224 @@
+"""Single-pass parser for the metal price sheets broadcast on WhatsApp.
+
+A broadcast carries a whole sheet, e.g.
+
+    *MCX*
+    *Aluminium* 2679.00 (+14.00)
+    *Copper* 812.40 (-3.10)
+    *LME*
+    *Aluminium* 2405.50 (+12.00)
+
+One precompiled pattern is run over the message with findall: it matches
+either a section header (MCX, LME, ...) or a metal name followed by its
+price and optional change, so every metal is extracted in one linear scan.
+A price without a "(change)" only counts inside a sheet, i.e. after a
+section header; in free text ("Lead 2025 price update") it is ignored.
+
+Metals keep their plain name ("aluminium", "copper_mini") in the MCX
+section or when the message has no header; quotes under any other section
+are stored with the section as prefix ("lme_aluminium"), so the MCX series
+the dashboard has always shown is not mixed with LME quotes.
+
+Archived messages are backfilled with:
+    python message_parser.py --backfill chat_export.txt messages.jsonl
+"""
+import argparse
+import hashlib
+import json
+import re
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+# Canonical metal -> spellings seen in broadcasts
+METALS = {
+    "aluminium": ("aluminium", "aluminum", "alu"),
+    "copper": ("copper",),
+    "zinc": ("zinc",),
+    "lead": ("lead",),
+    "nickel": ("nickel",),
+    "tin": ("tin",),
+}
+SECTIONS = ("MCX", "LME", "COMEX", "SHFE")
+DEFAULT_SECTION = "MCX"
+
+_ALIASES = {alias: metal for metal, aliases in METALS.items() for alias in aliases}
+_NUMBER = r"\d[\d,]*(?:\.\d+)?"
+
+_TOKEN = re.compile(
+    rf"""
+    ^[\s*_]*(?P<section>{"|".join(SECTIONS)})\b                 # section header at line start
+    |
+    \b(?P<metal>{"|".join(sorted(_ALIASES, key=len, reverse=True))})
+    (?P<mini>[\s_]*mini)?\b
+    [\s*_:=-]*                                                  # "*Aluminium* ", "Copper: ", "Zinc - "
+    (?P<price>{_NUMBER})
+    (?:[\s*_]*\(\s*(?P<change>[+-]?\s*{_NUMBER})[^)\n]*\))?      # "(+14.00)", "(-3.1, -0.4%)"
+    """,
+    re.IGNORECASE | re.MULTILINE | re.VERBOSE,
+)
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return float(text.replace(",", "").replace(" ", ""))
+
+
+def parse_message(message):
+    """All quotes in a message as [{"metal", "section", "price", "change", "change_pct"}].
+
+    change and change_pct are None when a sheet gives no change; outside a
+    sheet section a quote without a change is not a quote. A metal quoted
+    twice in the same section keeps the last quote.
+    """
+    quotes = {}
+    section, prefix, in_sheet = DEFAULT_SECTION, "", False
+    for header, name, mini, price, change in _TOKEN.findall(message or ""):
+        if header:
+            section = header.upper()
+            prefix = "" if section == DEFAULT_SECTION else f"{section.lower()}_"
+            in_sheet = True
+            continue
+        if not change and not in_sheet:
+            continue
+        metal = f"{prefix}{_ALIASES[name.lower()]}{'_mini' if mini else ''}"
+        price = _number(price)
+        change = _number(change) if change else None
+        quotes[metal] = {
+            "metal": metal,
+            "section": section,
+            "price": price,
+            "change": change,
+            # Relative to the quoted price, as the dashboard has always shown it
+            "change_pct": change / price * 100 if change is not None and price else None,
+        }
+    return list(quotes.values())
+
+
+def parse_messages(messages):
+    """Batch form of parse_message: yields (sid, received_at, quotes) per (sid, received_at, body)"""
+    for sid, received_at, body in messages:
+        yield sid, received_at, parse_message(body)
+
+
+# WhatsApp "Export chat" lines: "12/03/2024, 10:15 - Name: text" (Android) or
+# "[12/03/24, 10:15:22 AM] Name: text" (iOS); continuation lines have no prefix
+_EXPORT_LINE = re.compile(
+    r"^\[?(?P<date>\d{1,2}/\d{1,2}/\d{2,4}),\s*(?P<time>\d{1,2}:\d{2}(?::\d{2})?(?:\s*[AaPp][Mm])?)\]?"
+    r"\s*(?:-\s*)?(?P<author>[^:]+):\s?(?P<text>.*)$"
+)
+
+
+def _export_time(date, time):
+    """Exported timestamps are day-first (Indian locale)"""
+    time = time.replace("\u202f", " ").upper()
+    for date_format in ("%d/%m/%Y", "%d/%m/%y"):
+        for time_format in ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M:%S %p", "%I:%M%p", "%I:%M:%S%p"):
+            try:
+                return datetime.strptime(f"{date} {time}", f"{date_format} {time_format}").isoformat()
+            except ValueError:
+                continue
+    return None
+
+
+def _iso_time(value):
+    """ISO or RFC 2822 (Twilio's date_created) timestamp as a naive local ISO string"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def _export_sid(received_at, body):
+    # Stable id so the same export can be imported twice without duplicates
+    return "export-" + hashlib.sha1(f"{received_at}\n{body}".encode("utf-8")).hexdigest()[:20]
+
+
+def read_export(path):
+    """Messages of an archive as (sid, received_at, body).
+
+    .jsonl files hold one Twilio message per line ("sid"/"MessageSid",
+    "date_created"/"received_at", "body"/"Body"); anything else is read as
+    a WhatsApp chat export.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                body = item.get("body") or item.get("Body") or ""
+                received_at = _iso_time(item.get("received_at") or item.get("date_created"))
+                yield item.get("sid") or item.get("MessageSid") or _export_sid(received_at, body), received_at, body
+            return
+
+        current = None
+        for line in f:
+            line = line.rstrip("\n").lstrip("\ufeff")
+            match = _EXPORT_LINE.match(line)
+            received_at = match and _export_time(match.group("date"), match.group("time"))
+            if received_at:
+                if current:
+                    yield _export_sid(current[0], current[1]), current[0], current[1]
+                current = [received_at, match.group("text")]
+            elif current:
+                current[1] += "\n" + line
+        if current:
+            yield _export_sid(current[0], current[1]), current[0], current[1]
+
+
+def backfill(paths, store, batch_size=1000):
+    """Parse archived messages into the store; messages already in it are skipped"""
+    totals = {"messages": 0, "skipped": 0, "ticks": 0}
+
+    def flush(batch):
+        known = store.known_sids([sid for sid, _, _ in batch])
+        messages, ticks = [], []
+        for sid, received_at, body in batch:
+            if sid in known:
+                totals["skipped"] += 1
+                continue
+            known.add(sid)
+            quotes = parse_message(body)
+            messages.append((sid, received_at, body, "done" if quotes else "unparsed"))
+            ticks.extend(
+                (received_at, q["metal"], q["price"], q["change"], q["change_pct"], sid) for q in quotes
+            )
+        store.import_messages(messages, ticks)
+        totals["messages"] += len(messages)
+        totals["ticks"] += len(ticks)
+
+    for path in paths:
+        batch = []
+        for message in read_export(path):
+            if not message[1]:
+                continue
+            batch.append(message)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse WhatsApp metal price broadcasts")
+    parser.add_argument("--backfill", nargs="+", metavar="DUMP", help="chat export .txt or Twilio .jsonl files to import")
+    args = parser.parse_args()
+    if args.backfill:
+        from price_store import PriceStore
+
+        totals = backfill(args.backfill, PriceStore())
+        print(f"Imported {totals['messages']} messages ({totals['ticks']} ticks), skipped {totals['skipped']} already stored")
+    else:
+        parser.print_help()
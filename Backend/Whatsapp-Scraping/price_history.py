@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+# Candle widths served by /api/ohlc, in seconds
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+def to_epoch(ts):
+    return datetime.fromisoformat(ts).timestamp()
+
+
+class CandleSeries:
+    """OHLC candles of one width, updated in place as each tick arrives"""
+
+    def __init__(self, seconds, size):
+        self.seconds = seconds
+        self.candles = deque(maxlen=size)
+
+    def update(self, epoch, price):
+        start = int(epoch // self.seconds) * self.seconds
+        # Ticks arrive in order, so this is almost always the last candle
+        for candle in reversed(self.candles):
+            if candle["_start"] == start:
+                candle["high"] = max(candle["high"], price)
+                candle["low"] = min(candle["low"], price)
+                if epoch >= candle["_last"]:
+                    candle["close"], candle["_last"] = price, epoch
+                candle["ticks"] += 1
+                return
+            if candle["_start"] < start:
+                break
+        candle = {
+            "start": datetime.fromtimestamp(start).isoformat(),
+            "open": price, "high": price, "low": price, "close": price,
+            "ticks": 1, "_start": start, "_last": epoch,
+        }
+        if not self.candles or self.candles[-1]["_start"] < start:
+            self.candles.append(candle)
+        else:
+            # Late tick for a bucket we have no candle for yet: keep the order
+            ordered = sorted([*self.candles, candle], key=lambda c: c["_start"])
+            self.candles.clear()
+            self.candles.extend(ordered[-self.candles.maxlen:])
+
+    def latest(self, limit):
+        candles = list(self.candles)[-limit:]
+        return [{key: value for key, value in candle.items() if not key.startswith("_")} for candle in candles]
+
+
+class PriceHistory:
+    """In-memory ring buffer of recent ticks per metal, plus incremental candles.
+
+    The store stays the durable copy: load() refills the buffers from it at
+    startup, and older ranges than the buffer holds are read from it.
+    """
+
+    def __init__(self, store, size=5000, candles=1000):
+        self.store = store
+        self.size = size
+        self.candle_count = candles
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _metal(self, metal):
+        series = self._series.get(metal)
+        if series is None:
+            series = {
+                "ticks": deque(maxlen=self.size),
+                "candles": {name: CandleSeries(seconds, self.candle_count) for name, seconds in INTERVALS.items()},
+            }
+            self._series[metal] = series
+        return series
+
+    def load(self, metals=None):
+        """Refill the buffers from the store (every stored metal by default)"""
+        for metal in self.store.metals() if metals is None else metals:
+            for tick in self.store.ticks(metal=metal, limit=self.size):
+                self.add(tick)
+
+    def add(self, tick):
+        """tick: {"timestamp", "metal", "price", "change", "change_pct"}"""
+        epoch = to_epoch(tick["timestamp"])
+        with self._lock:
+            series = self._metal(tick["metal"])
+            series["ticks"].append(tick)
+            if tick["price"] is not None:
+                for candles in series["candles"].values():
+                    candles.update(epoch, tick["price"])
+
+    def ticks(self, metal, start=None, limit=500):
+        with self._lock:
+            buffered = list(self._series[metal]["ticks"]) if metal in self._series else []
+        if start and (not buffered or start < buffered[0]["timestamp"]):
+            # Older than the ring buffer reaches back: read the range from disk
+            return self.store.ticks(metal=metal, start=start, limit=limit)
+        if start:
+            buffered = [tick for tick in buffered if tick["timestamp"] >= start]
+        return buffered[-limit:]
+
+    def ohlc(self, metal, interval, limit=500):
+        with self._lock:
+            if metal not in self._series:
+                return []
+            return self._series[metal]["candles"][interval].latest(limit)
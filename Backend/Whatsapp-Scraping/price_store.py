@@ -0,0 +1,139 @@
+"""SQLite persistence for the WhatsApp price feed.
+
+``messages`` records every inbound Twilio message by MessageSid, so a
+redelivered webhook is recognised even across restarts, and a message that
+was acknowledged but not processed yet (status 'queued') can be picked up
+again at startup. ``ticks`` holds the parsed prices.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DB_PATH = os.getenv("WHATSAPP_DB", os.path.join("data", "whatsapp_prices.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    sid          TEXT PRIMARY KEY,
+    received_at  TEXT NOT NULL,
+    body         TEXT,
+    status       TEXT NOT NULL DEFAULT 'queued'
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_status ON messages (status);
+CREATE TABLE IF NOT EXISTS ticks (
+    ts          TEXT NOT NULL,
+    metal       TEXT NOT NULL,
+    price       REAL,
+    change      REAL,
+    change_pct  REAL,
+    sid         TEXT
+);
+CREATE INDEX IF NOT EXISTS ticks_metal_ts ON ticks (metal, ts);
+"""
+
+
+class PriceStore:
+    """Thread-safe access to the messages/ticks tables (one connection per thread)"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def claim_message(self, sid, body, received_at=None):
+        """Record a new message; returns False if this MessageSid was seen before"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO messages (sid, received_at, body) VALUES (?, ?, ?)",
+                (sid, received_at or datetime.now().isoformat(), body),
+            )
+        return cursor.rowcount == 1
+
+    def release_message(self, sid):
+        """Undo claim_message() for a message that was never queued, so a redelivery is accepted"""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM messages WHERE sid = ? AND status = 'queued'", (sid,))
+
+    def mark_message(self, sid, status):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE messages SET status = ? WHERE sid = ?", (status, sid))
+
+    def pending_messages(self):
+        """Messages acknowledged but never processed, oldest first"""
+        return self._connect().execute(
+            "SELECT sid, body, received_at FROM messages WHERE status = 'queued' ORDER BY received_at"
+        ).fetchall()
+
+    def append_ticks(self, ticks):
+        """Insert (ts, metal, price, change, change_pct, sid) rows in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO ticks (ts, metal, price, change, change_pct, sid) VALUES (?, ?, ?, ?, ?, ?)",
+                ticks,
+            )
+
+    def known_sids(self, sids):
+        """The subset of sids already recorded"""
+        known = set()
+        conn = self._connect()
+        sids = list(sids)
+        for i in range(0, len(sids), 500):
+            chunk = sids[i:i + 500]
+            rows = conn.execute(
+                f"SELECT sid FROM messages WHERE sid IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            known.update(sid for sid, in rows)
+        return known
+
+    def import_messages(self, messages, ticks):
+        """Bulk insert of (sid, received_at, body, status) messages and their ticks in one transaction"""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO messages (sid, received_at, body, status) VALUES (?, ?, ?, ?)",
+                messages,
+            )
+            conn.executemany(
+                "INSERT INTO ticks (ts, metal, price, change, change_pct, sid) VALUES (?, ?, ?, ?, ?, ?)",
+                ticks,
+            )
+
+    def metals(self):
+        return [metal for metal, in self._connect().execute("SELECT DISTINCT metal FROM ticks ORDER BY metal")]
+
+    def ticks(self, metal=None, start=None, end=None, limit=5000):
+        """Stored ticks between start and end (ISO strings), oldest first"""
+        sql = "SELECT ts, metal, price, change, change_pct FROM ticks WHERE 1 = 1"
+        params = []
+        if metal:
+            sql += " AND metal = ?"
+            params.append(metal)
+        if start:
+            sql += " AND ts >= ?"
+            params.append(start)
+        if end:
+            sql += " AND ts <= ?"
+            params.append(end)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        rows = self._connect().execute(sql, params).fetchall()
+        return [
+            {"timestamp": ts, "metal": metal_, "price": price, "change": change, "change_pct": change_pct}
+            for ts, metal_, price, change, change_pct in reversed(rows)
+        ]
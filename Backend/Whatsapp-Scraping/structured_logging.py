@@ -0,0 +1,165 @@
+"""Structured, off-the-hot-path logging for the WhatsApp service.
+
+Request handlers only put a LogRecord on an in-memory queue; a
+QueueListener thread formats it as one JSON line and writes it out, so no
+request waits on stdout. Access logs are sampled per route and carry a
+bounded, redacted summary of the request instead of headers and raw bodies.
+
+Configuration (environment):
+    LOG_LEVEL   minimum level for everything (default INFO)
+    LOG_ROUTES  per-endpoint "sample rate:level" overrides, e.g.
+                "webhook=0.1:INFO,status=0:DEBUG,get_price_data=0.01:DEBUG"
+    LOG_QUEUE   set to 0 to write synchronously (for comparison only)
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+# Default access-log sampling and level per Flask endpoint
+ROUTE_LOGGING = {
+    "webhook": (1.0, logging.INFO),
+    "status": (0.1, logging.DEBUG),
+    "get_price_data": (0.01, logging.DEBUG),
+    "get_price_history": (0.01, logging.DEBUG),
+    "get_ohlc": (0.01, logging.DEBUG),
+    "ingest_stats": (0.01, logging.DEBUG),
+    "home": (0.01, logging.DEBUG),
+}
+DEFAULT_ROUTE_LOGGING = (1.0, logging.INFO)
+
+MAX_FIELDS = 12
+MAX_VALUE = 80
+REDACT_FIELDS = {"From", "To", "WaId", "ProfileName", "AccountSid", "Author"}
+BODY_FIELDS = {"Body"}
+
+# Fields a LogRecord always has; anything else came in through ``extra``
+_RECORD_FIELDS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _parse_routes(text):
+    routes = dict(ROUTE_LOGGING)
+    for item in filter(None, (part.strip() for part in (text or "").split(","))):
+        endpoint, _, spec = item.partition("=")
+        rate, _, level = spec.partition(":")
+        default_rate, default_level = routes.get(endpoint, DEFAULT_ROUTE_LOGGING)
+        routes[endpoint] = (
+            float(rate) if rate else default_rate,
+            logging.getLevelName(level.upper()) if level else default_level,
+        )
+    return routes
+
+
+_listener = None
+
+
+def setup_logging(name="whatsapp"):
+    """Configure the service logger once and return it"""
+    global _listener
+    logger = logging.getLogger(name)
+    if logger.handlers:
+        return logger
+    logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    if os.getenv("LOG_QUEUE", "1") == "1":
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        logger.addHandler(handler)
+    return logger
+
+
+def _clip(value):
+    value = str(value)
+    return value if len(value) <= MAX_VALUE else f"{value[:MAX_VALUE]}…(+{len(value) - MAX_VALUE})"
+
+
+def _mask(value):
+    value = str(value)
+    return f"***{value[-4:]}" if len(value) > 4 else "***"
+
+
+def redact_fields(data):
+    """Bounded copy of form/JSON fields: identities masked, message bodies reduced to their length"""
+    summary = {}
+    for key, value in list((data or {}).items())[:MAX_FIELDS]:
+        if key in REDACT_FIELDS:
+            summary[key] = _mask(value)
+        elif key in BODY_FIELDS:
+            summary[key] = f"<{len(str(value))} chars>"
+        else:
+            summary[key] = _clip(value)
+    if data and len(data) > MAX_FIELDS:
+        summary["_more"] = len(data) - MAX_FIELDS
+    return summary
+
+
+class AccessLog:
+    """Per-route sampled access logging for a Flask app"""
+
+    def __init__(self, logger, routes=None, rng=random.random):
+        self.logger = logger
+        self.routes = routes or _parse_routes(os.getenv("LOG_ROUTES"))
+        self.rng = rng
+
+    def init_app(self, app):
+        from flask import g, request
+
+        @app.before_request
+        def _start_timer():
+            g.log_started = time.perf_counter()
+
+        @app.after_request
+        def _access_log(response):
+            rate, level = self.routes.get(request.endpoint, DEFAULT_ROUTE_LOGGING)
+            if response.status_code >= 500:
+                # Failures are always logged regardless of sampling
+                rate, level = 1.0, logging.ERROR
+            if not self.logger.isEnabledFor(level) or (rate < 1.0 and self.rng() >= rate):
+                return response
+            started = g.get("log_started")
+            fields = {
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint,
+                "status": response.status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2) if started else None,
+                "bytes_in": request.content_length,
+                "sample_rate": rate,
+            }
+            # Only summarise bodies the handler already parsed, never parse one just to log it
+            if request.method == "POST" and "form" in request.__dict__:
+                fields["form"] = redact_fields(request.form)
+            self.logger.log(level, "request", extra=fields)
+            return response
+
+        return app
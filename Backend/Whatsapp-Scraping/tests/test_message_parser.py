@@ -0,0 +1,48 @@
+"""parse_message on sheets, single quotes and chatter that only looks like a quote.
+
+Run from Backend/Whatsapp-Scraping:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_parser import parse_message  # noqa: E402
+
+
+def prices(message):
+    return {quote["metal"]: (quote["price"], quote["change"]) for quote in parse_message(message)}
+
+
+class ParseMessageTest(unittest.TestCase):
+    def test_single_quote(self):
+        self.assertEqual(prices("*Aluminium* 2679.00 (+14.00)"), {"aluminium": (2679.0, 14.0)})
+
+    def test_sheet_with_sections(self):
+        message = (
+            "*MCX*\n"
+            "*Aluminium* 2679.00 (+14.00)\n"
+            "*Copper Mini* 812.40 (-3.10)\n"
+            "*LME*\n"
+            "*Aluminium* 2405.50\n"
+        )
+        self.assertEqual(prices(message), {
+            "aluminium": (2679.0, 14.0),
+            "copper_mini": (812.4, -3.1),
+            "lme_aluminium": (2405.5, None),
+        })
+
+    def test_bare_number_outside_a_sheet_is_not_a_quote(self):
+        self.assertEqual(parse_message("Lead 2025 price update"), [])
+        self.assertEqual(parse_message("Tin 3 lots booked, Zinc 12 pending"), [])
+        self.assertEqual(parse_message("Lead time for delivery is 3 days"), [])
+
+    def test_quote_next_to_chatter(self):
+        message = "Lead 2025 price update\n*Lead* 182.35 (+0.40)"
+        self.assertEqual(prices(message), {"lead": (182.35, 0.4)})
+
+
+if __name__ == "__main__":
+    unittest.main()
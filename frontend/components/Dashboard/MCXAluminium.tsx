@@ -25,6 +25,19 @@ interface PriceData {
   };
 }
 
+// Apply a `delta` event from the stream: only the fields that changed are sent
+function mergeDelta<T>(current: T, changes: Record<string, unknown>): T {
+  const merged: Record<string, unknown> = { ...(current as Record<string, unknown>) };
+  for (const [key, value] of Object.entries(changes)) {
+    const previous = merged[key];
+    merged[key] =
+      value && typeof value === "object" && previous && typeof previous === "object"
+        ? mergeDelta(previous, value as Record<string, unknown>)
+        : value;
+  }
+  return merged as T;
+}
+
 export default function MCXAluminium() {
   // State to hold the streaming data
   const [streamData, setStreamData] = useState<PriceData | null>(null);
@@ -35,7 +48,10 @@ export default function MCXAluminium() {
   const [isPolling, setIsPolling] = useState(false);
 
   // Use a direct connection to your streaming server
-  const sseUrl = "http://localhost:5002/stream"; // Your actual SSE stream URL
+  // NEXT_PUBLIC_GATEWAY_URL points at the ASGI gateway instead of the standalone MCX service
+  const sseUrl = process.env.NEXT_PUBLIC_GATEWAY_URL
+    ? `${process.env.NEXT_PUBLIC_GATEWAY_URL}/mcx/stream`
+    : "http://localhost:5002/stream"; // Your actual SSE stream URL
   
   const sampleData = useMemo<PriceData>(() => ({
     date: format(new Date(), "yyyy-MM-dd"),
@@ -101,39 +117,69 @@ export default function MCXAluminium() {
     // First try using Server-Sent Events
     let eventSource: EventSource | null = null;
     let pollingInterval: NodeJS.Timeout | null = null;
+    let lastSeq = 0;
+
+    // (Re)connect; the server starts every connection with a full snapshot
+    function connectStream() {
+      lastSeq = 0;
+      const source = new EventSource(sseUrl);
+      eventSource = source;
+
+      // Full snapshots arrive as plain messages; their SSE id is the sequence number
+      source.onmessage = (event) => {
+        try {
+          const parsed = JSON.parse(event.data);
+          lastSeq = Number(event.lastEventId) || 0;
+          setStreamData(parsed);
+          setLastUpdated(new Date());
+          setConnectionError(null);
+          setIsPolling(false);
+        } catch (error) {
+          console.error("Error parsing SSE data:", error);
+          setConnectionError("Error parsing data from server");
+
+          // Fall back to HTTP polling with sample data
+          fallbackToPolling();
+        }
+      };
+
+      // After the snapshot the server only pushes the fields that changed
+      source.addEventListener("delta", (event) => {
+        try {
+          const { seq, changes } = JSON.parse((event as MessageEvent).data);
+          if (lastSeq && seq !== lastSeq + 1) {
+            // The state is out of date: merging onto it would show wrong prices,
+            // so resync from the snapshot a new connection starts with
+            console.warn(`Missed MCX updates (expected ${lastSeq + 1}, got ${seq}), reconnecting`);
+            source.close();
+            connectStream();
+            return;
+          }
+          lastSeq = seq;
+          setStreamData((prev) => (prev ? mergeDelta(prev, changes) : prev));
+          setLastUpdated(new Date());
+        } catch (error) {
+          console.error("Error applying SSE delta:", error);
+        }
+      });
+
+      source.onerror = (err) => {
+        console.error("SSE error - falling back to polling:", err);
+        source.close();
+        if (eventSource === source) {
+          eventSource = null;
+        }
+
+        // Fall back to polling
+        fallbackToPolling();
+      };
+    }
 
     try {
       // Check if EventSource is supported by the browser
       if (typeof EventSource !== "undefined") {
         // Connect directly to your streaming server
-        eventSource = new EventSource(sseUrl);
-
-        eventSource.onmessage = (event) => {
-          try {
-            const parsed = JSON.parse(event.data);
-            setStreamData(parsed);
-            setLastUpdated(new Date());
-            setConnectionError(null);
-            setIsPolling(false);
-          } catch (error) {
-            console.error("Error parsing SSE data:", error);
-            setConnectionError("Error parsing data from server");
-
-            // Fall back to HTTP polling with sample data
-            fallbackToPolling();
-          }
-        };
-
-        eventSource.onerror = (err) => {
-          console.error("SSE error - falling back to polling:", err);
-          if (eventSource) {
-            eventSource.close();
-            eventSource = null;
-          }
-
-          // Fall back to polling
-          fallbackToPolling();
-        };
+        connectStream();
       } else {
         // EventSource not supported, fallback immediately
         console.log("EventSource not supported in this browser");
@@ -6,7 +6,9 @@ export default async function handler(
 ) {
   try {
     // Correct Flask API URL
-    const response = await fetch("http://localhost:5003/data");
+    const response = await fetch(
+      process.env.GATEWAY_URL ? `${process.env.GATEWAY_URL}/lme/data` : "http://localhost:5003/data"
+    );
 
     // Read raw response
     const text = await response.text();
@@ -12,7 +12,11 @@ export default async function handler(
   res: NextApiResponse
 ) {
   try {
-    const response = await fetch('https://591c-2401-4900-57a3-b6fb-69c5-cc00-b7cb-2af0.ngrok-free.app/api/price-data');
+    const response = await fetch(
+      process.env.GATEWAY_URL
+        ? `${process.env.GATEWAY_URL}/whatsapp/api/price-data`
+        : 'https://591c-2401-4900-57a3-b6fb-69c5-cc00-b7cb-2af0.ngrok-free.app/api/price-data'
+    );
     
     if (!response.ok) {
       throw new Error('Failed to fetch price data');
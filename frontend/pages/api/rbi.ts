@@ -16,7 +16,9 @@ export default async function handler(
   res: NextApiResponse<ApiResponse>
 ) {
   try {
-    const response = await fetch("http://127.0.0.1:5000/scrape"); // Calls Flask API
+    const response = await fetch(
+      process.env.GATEWAY_URL ? `${process.env.GATEWAY_URL}/rbi/scrape` : "http://127.0.0.1:5000/scrape"
+    ); // Calls Flask API (or the gateway when GATEWAY_URL is set)
     const data = await response.json();
 
     if (!response.ok) {
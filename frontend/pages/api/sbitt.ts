@@ -6,7 +6,9 @@ export default async function handler(
 ) {
   try {
     // ✅ Correct Flask API URL
-    const response = await fetch("http://127.0.0.1:5001/scrape-sbi-tt");
+    const response = await fetch(
+      process.env.GATEWAY_URL ? `${process.env.GATEWAY_URL}/sbi/scrape-sbi-tt` : "http://127.0.0.1:5001/scrape-sbi-tt"
+    );
 
     // ✅ Read raw response
     const text = await response.text();